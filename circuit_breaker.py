@@ -0,0 +1,284 @@
+"""
+Circuit Breaker and Retry Policy for ESP32 HTTP Clients
+
+Keeps track of which boards are answering so that callers stop waiting
+on a board that is down or rebooting. Each host has one circuit breaker
+shared by every client, Streamlit session and thread in the process:
+
+- CLOSED: requests go through; consecutive connection failures are counted
+- OPEN: requests fail immediately until the reset timeout has passed
+- HALF_OPEN: a single probe request is let through; success closes the
+  circuit, failure opens it again with a longer (jittered) timeout. A
+  probe that never reports back loses its lease after probe_timeout, and
+  the next caller becomes the probe
+
+Retries use exponential backoff with jitter, and stop as soon as the
+circuit opens, so one caller pays for a dead board at most once.
+
+Features:
+- Per-host breaker registry shared across sessions and threads
+- Jittered exponential backoff between retries
+- Half-open probing with growing reset timeout
+- Retry helper that never sleeps on an open circuit
+
+Author: Erfan Mohamadnia
+License: MIT
+Version: 1.0.0
+
+Usage Example:
+    from circuit_breaker import RetryPolicy, CircuitOpenError, call_with_retry
+
+    try:
+        response = call_with_retry("192.168.1.100", lambda: requests.get(url, timeout=5),
+                                   RetryPolicy(max_retries=3),
+                                   retry_on=(requests.exceptions.ConnectionError,
+                                             requests.exceptions.Timeout))
+    except CircuitOpenError as e:
+        print(f"Board unavailable, next probe in {e.retry_after:.0f}s")
+"""
+
+import random
+import threading
+import time
+from dataclasses import dataclass
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised when a request is refused because the host's circuit is open."""
+
+    def __init__(self, host, retry_after):
+        """
+        Args:
+            host (str): Host whose circuit is open
+            retry_after (float): Seconds until the next probe is allowed
+        """
+        super().__init__(f"{host} is unavailable, retry in {retry_after:.0f}s")
+        self.host = host
+        self.retry_after = retry_after
+
+
+@dataclass
+class RetryPolicy:
+    """
+    Exponential backoff with jitter.
+
+    Attributes:
+        max_retries (int): Attempts per call, the first one included
+        base_delay (float): Delay before the second attempt in seconds
+        max_delay (float): Upper bound of a single delay in seconds
+        jitter (float): Fraction of each delay that is randomized (0-1)
+    """
+    max_retries: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 8.0
+    jitter: float = 0.5
+
+    def delay(self, attempt):
+        """
+        Get the wait before the next attempt.
+
+        Args:
+            attempt (int): Number of the attempt that just failed, from 0
+
+        Returns:
+            float: Seconds to wait
+        """
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return delay * (1 - self.jitter) + random.uniform(0, delay * self.jitter)
+
+
+class CircuitBreaker:
+    """
+    Failure tracker of one host.
+
+    Attributes:
+        failure_threshold (int): Consecutive failures that open the circuit
+        reset_timeout (float): First open period in seconds
+        max_reset_timeout (float): Longest open period in seconds
+        probe_timeout (float): Seconds a half-open probe may take before
+            another caller is allowed to probe
+    """
+
+    def __init__(self, failure_threshold=3, reset_timeout=5.0, max_reset_timeout=60.0,
+                 probe_timeout=30.0):
+        """
+        Args:
+            failure_threshold (int): Consecutive failures that open the circuit
+            reset_timeout (float): First open period in seconds
+            max_reset_timeout (float): Longest open period in seconds
+            probe_timeout (float): Seconds a half-open probe may take before
+                another caller is allowed to probe
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.probe_timeout = probe_timeout
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._open_timeout = reset_timeout
+        self._open_until = 0.0
+        self._probe_in_flight = False
+        self._probe_started = 0.0
+
+    @property
+    def state(self):
+        """str: CLOSED, OPEN or HALF_OPEN."""
+        with self._lock:
+            return self._state
+
+    def allow_request(self):
+        """
+        Decide whether a request may be sent now.
+
+        Once the open period has passed, exactly one caller is let through
+        as the half-open probe; everyone else keeps failing fast until the
+        probe has reported back, or until its lease of ``probe_timeout``
+        seconds has run out.
+
+        Returns:
+            bool: True if the request may go ahead
+        """
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            now = time.monotonic()
+            if self._state == OPEN and now >= self._open_until:
+                self._state = HALF_OPEN
+                self._probe_in_flight = False
+            if self._state == HALF_OPEN and (
+                    not self._probe_in_flight or now - self._probe_started >= self.probe_timeout):
+                self._probe_in_flight = True
+                self._probe_started = now
+                return True
+            return False
+
+    def record_success(self):
+        """Close the circuit after the host answered."""
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._open_timeout = self.reset_timeout
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        """Count a connection failure, opening the circuit if needed."""
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN:
+                # The probe failed: stay away longer, with jitter so that
+                # many breakers do not probe in lockstep
+                self._open_timeout = min(self.max_reset_timeout, self._open_timeout * 2)
+                self._open(self._open_timeout * random.uniform(0.8, 1.2))
+            elif self._state == CLOSED and self._failures >= self.failure_threshold:
+                self._open(self._open_timeout)
+
+    def release_probe(self):
+        """
+        Give up a half-open probe without reporting an outcome.
+
+        For requests that failed before reaching the host (e.g. a local
+        error), so the next caller may probe instead.
+        """
+        with self._lock:
+            self._probe_in_flight = False
+
+    def _open(self, timeout):
+        self._state = OPEN
+        self._open_until = time.monotonic() + timeout
+        self._probe_in_flight = False
+
+    def retry_after(self):
+        """
+        Get the time until the next request may be sent.
+
+        Returns:
+            float: Seconds, 0 if requests are allowed now
+        """
+        with self._lock:
+            if self._state != OPEN:
+                return 0.0
+            return max(0.0, self._open_until - time.monotonic())
+
+
+class BreakerRegistry:
+    """Thread-safe map of host to CircuitBreaker."""
+
+    def __init__(self, **breaker_options):
+        """
+        Args:
+            **breaker_options: CircuitBreaker arguments for new hosts
+        """
+        self._lock = threading.Lock()
+        self._breakers = {}
+        self._options = breaker_options
+
+    def get(self, host):
+        """
+        Get the breaker of a host, creating it on first use.
+
+        Args:
+            host (str): Host name or "ip:port"
+
+        Returns:
+            CircuitBreaker: Breaker shared by all callers for this host
+        """
+        with self._lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = CircuitBreaker(**self._options)
+                self._breakers[host] = breaker
+            return breaker
+
+
+# Process-wide registry shared by the HTTP clients and the Streamlit app
+breakers = BreakerRegistry()
+
+
+def call_with_retry(host, func, policy=None, retry_on=(Exception,), sleep=time.sleep):
+    """
+    Call ``func`` through the host's circuit breaker, retrying failures.
+
+    Only exceptions listed in ``retry_on`` count as host failures; any
+    other exception (or a return value) means the host answered.
+
+    Args:
+        host (str): Host the call talks to
+        func (callable): Function performing one request
+        policy (RetryPolicy, optional): Backoff policy, defaults to RetryPolicy()
+        retry_on (tuple): Exception types treated as connection failures
+        sleep (callable): Sleep function, replaceable for non-blocking callers
+
+    Returns:
+        Any: Return value of ``func``
+
+    Raises:
+        CircuitOpenError: If the circuit is or becomes open
+        Exception: The last failure once all attempts are used up
+    """
+    policy = policy or RetryPolicy()
+    breaker = breakers.get(host)
+    attempts = max(1, policy.max_retries)
+
+    for attempt in range(attempts):
+        if not breaker.allow_request():
+            raise CircuitOpenError(host, breaker.retry_after())
+        try:
+            result = func()
+        except retry_on:
+            breaker.record_failure()
+            if attempt == attempts - 1:
+                raise
+            if breaker.state != CLOSED:
+                raise CircuitOpenError(host, breaker.retry_after())
+            sleep(policy.delay(attempt))
+        except Exception:
+            breaker.record_success()  # The host answered, the request failed
+            raise
+        else:
+            breaker.record_success()
+            return result
@@ -41,6 +41,9 @@ WIFI_CONFIG = {
 HARDWARE_CONFIG = {
     # GPIO pins for relay control: [pump1, pump2, pump3, dcmotor]
     'relay_pins': [14, 25, 26, 27],
+    # Switch relays through the GPIO set/clear registers (classic ESP32 only;
+    # ignored on S2/S3/C3 and other ports, which use per-pin writes)
+    'relay_register_writes': False,
     
     # I2C bus configuration for PCA9685 servo driver
     'i2c_config': {
@@ -54,7 +57,10 @@ HARDWARE_CONFIG = {
         'channel': 0,                   # PCA9685 channel for servo
         'min_pulse_us': 500,            # Minimum pulse width (microseconds)
         'max_pulse_us': 2500,           # Maximum pulse width (microseconds)
-        'frequency': 50                 # PWM frequency in Hz (standard for servos)
+        'frequency': 50,                # PWM frequency in Hz (standard for servos)
+        'max_speed': 120,               # Smooth move cruise speed (degrees/second)
+        'acceleration': 240,            # Smooth move ramp (degrees/second², 0 = linear)
+        'step_ms': 20                   # Trajectory update interval (milliseconds)
     }
 }
 
@@ -64,7 +70,16 @@ HARDWARE_CONFIG = {
 WEB_SERVER_CONFIG = {
     'port': 80,                         # HTTP server port
     'bind_ip': '0.0.0.0',              # Bind to all network interfaces
-    'max_connections': 10               # Maximum concurrent connections
+    'max_connections': 10,              # Maximum concurrent connections
+    'reserved_control_connections': 3,  # Slots /events and /ws streams may never take (kept for control requests)
+    'keep_alive_timeout': 5,            # Idle seconds before a persistent connection is closed
+    'request_timeout': 5,               # Seconds to receive a request's headers/body or drain a response
+    'retry_after': 2,                   # Retry-After seconds sent with 503 when all connections are busy
+    'max_keep_alive_requests': 100,     # Requests served per connection before closing
+    'max_body': 2048,                   # Largest accepted request body (bytes); larger ones get 413
+    'event_queue_size': 16,             # Pending events per /events client before coalescing drops
+    'event_ping_interval': 15,          # Seconds between keep-alive comments on idle event streams
+    'websocket_max_message': 512        # Largest accepted WebSocket command message (bytes)
 }
 
 # ============================================================================
@@ -73,8 +88,9 @@ WEB_SERVER_CONFIG = {
 
 TASK_CONFIG = {
     'filename': 'tasks.json',           # Task storage file
-    'max_tasks': 50,                    # Maximum number of scheduled tasks
-    'check_interval': 60                # Task check interval in seconds
+    'max_tasks': 200,                   # Maximum number of scheduled tasks
+    'journal_compact_entries': 32,      # Journal records before compacting into tasks.json
+    'check_interval': 300               # Longest scheduler sleep between wake-ups (seconds)
 }
 
 # ============================================================================
@@ -128,20 +144,26 @@ SYSTEM_CONFIG = {
 # API Routes and Endpoints
 # ============================================================================
 API_ROUTES = {
+    # Templates are compiled once by WebServer.register_routes; <int:name>
+    # segments are converted to int before the handler runs
+    
     # Primary ESP32 web server endpoints (active routes)
-    'relay_control': '/relay/<channel>/<action>',     # Control relay: /relay/0/on, /relay/1/off
-    'servo_control': '/servo/<angle>',                # Control servo: /servo/90
+    'relay_control': '/relay/<int:channel>/<action>', # Control relay: /relay/0/on, /relay/1/off
+    'relay_batch': '/relay/batch',                    # Batch control: /relay/batch?set=0:on,2:off,3:on:30
+    'servo_control': '/servo/<int:angle>',            # Control servo: /servo/90
     'status': '/status',                              # System status and diagnostics
+    'events': '/events',                              # Server-Sent Events stream of state changes
+    'websocket': '/ws',                               # WebSocket control channel
     
     # Legacy API endpoints (maintained for backward compatibility)
-    'pump_control': '/api/pump/<id>/<action>',        # Legacy pump control
-    'pump_timed': '/api/pump/<id>/on/<duration>',     # Legacy timed pump operation
+    'pump_control': '/api/pump/<int:id>/<action>',    # Legacy pump control
+    'pump_timed': '/api/pump/<int:id>/on/<int:duration>',  # Legacy timed pump operation
     'dcmotor_control': '/api/dcmotor/<action>',       # Legacy DC motor control
-    'dcmotor_timed': '/api/dcmotor/on/<duration>',    # Legacy timed DC motor operation
+    'dcmotor_timed': '/api/dcmotor/on/<int:duration>',  # Legacy timed DC motor operation
     'time': '/api/time',                              # Current system time
     'tasks': '/api/tasks',                            # Task management
     'task_add': '/api/task/add',                      # Add new scheduled task
-    'task_delete': '/api/task/<id>/delete'            # Delete scheduled task
+    'task_delete': '/api/task/<int:id>/delete'        # Delete scheduled task
 }
 
 # ============================================================================
@@ -151,7 +173,7 @@ DEFAULTS = {
     'pump_duration': 30,                # Default pump runtime (seconds)
     'dcmotor_duration': 60,             # Default DC motor runtime (seconds)
     'servo_angle': 90,                  # Default servo position (degrees)
-    'task_check_tolerance': 2           # Time tolerance for task execution (seconds)
+    'task_check_tolerance': 300         # Catch-up window: late tasks still run if missed by at most this (seconds)
 }
 
 # ============================================================================
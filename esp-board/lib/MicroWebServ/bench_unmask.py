@@ -0,0 +1,67 @@
+"""
+Benchmark of WebSocket payload unmasking
+========================================
+
+Compares the original per-byte unmask loop of MicroWebSocket with the
+current MicroWebSocket._unmask (viper fast path when available, block
+XOR fallback otherwise) and checks that both produce the same bytes.
+
+Run on the board from the lib directory:
+    import MicroWebServ.bench_unmask
+
+Author: Erfan Mohamadnia
+License: MIT
+Version: 1.0.0
+"""
+
+import time
+
+try :
+    from MicroWebServ.microWebSocket import MicroWebSocket, _unmaskViper
+except ImportError :
+    from microWebSocket import MicroWebSocket, _unmaskViper
+
+try :
+    _ticks_us   = time.ticks_us
+    _ticks_diff = time.ticks_diff
+except AttributeError :   # CPython
+    _ticks_us   = lambda : int(time.perf_counter() * 1000000)
+    _ticks_diff = lambda a, b : a - b
+
+SIZES  = (16, 125, 512, 1024, 4096)
+ROUNDS = 20
+MASK   = b'\x37\xfa\x21\x3d'
+
+
+def _unmaskLegacy(buf, length, mask) :
+    # Loop used by _receiveFrame before the fast path was added
+    for i in range(length) :
+        buf[i] ^= mask[i%4]
+
+
+def _timeUs(func, buf, length) :
+    start = _ticks_us()
+    for x in range(ROUNDS) :
+        func(buf, length, MASK)
+    return _ticks_diff(_ticks_us(), start) // ROUNDS
+
+
+def run() :
+    mode = 'viper' if _unmaskViper else 'block XOR'
+    print('Unmask benchmark (%s), %d rounds per size' % (mode, ROUNDS))
+    print('%8s %12s %12s %8s' % ('bytes', 'legacy us', 'fast us', 'speedup'))
+    for size in SIZES :
+        data   = bytes((i * 7) & 0xFF for i in range(size))
+        legacy = bytearray(data)
+        fast   = bytearray(data)
+        _unmaskLegacy(legacy, size, MASK)
+        MicroWebSocket._unmask(memoryview(fast), size, MASK)
+        if legacy != fast :
+            print('%8d MISMATCH' % size)
+            continue
+        tLegacy = _timeUs(_unmaskLegacy, bytearray(data), size)
+        tFast   = _timeUs(MicroWebSocket._unmask, memoryview(bytearray(data)), size)
+        print('%8d %12d %12d %7.1fx' % (size, tLegacy, tFast, tLegacy / max(tFast, 1)))
+
+
+run()
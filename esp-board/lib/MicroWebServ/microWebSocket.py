@@ -5,10 +5,34 @@ Copyright © 2018 Jean-Christophe Bos & HC² (www.hc2.fr)
 
 from   hashlib     import sha1
 from   binascii    import b2a_base64
-from   struct      import pack
 from   _thread     import start_new_thread, allocate_lock
 import gc
 
+try :
+    import micropython
+
+    @micropython.viper
+    def _unmaskViper(buf, length:int, mask) :
+        b  = ptr8(buf)
+        m  = ptr8(mask)
+        m0 = m[0]
+        m1 = m[1]
+        m2 = m[2]
+        m3 = m[3]
+        i  = 0
+        n  = length & ~3
+        while i < n :
+            b[i]   ^= m0
+            b[i+1] ^= m1
+            b[i+2] ^= m2
+            b[i+3] ^= m3
+            i += 4
+        while i < length :
+            b[i] ^= m[i & 3]
+            i += 1
+except :
+    _unmaskViper = None
+
 class MicroWebSocket :
 
     # ============================================================================
@@ -27,6 +51,10 @@ class MicroWebSocket :
     _msgTypeText   = 1
     _msgTypeBin    = 2
 
+    _unmaskBlock   = 64     # Bytes XORed per step by the portable unmask
+    _sendSmallMax  = 0x7D   # Payloads up to this size are sent in one write
+    _streamChunk   = 512    # Default fragment size of SendStream
+
     # ============================================================================
     # ===( Utils  )===============================================================
     # ============================================================================
@@ -43,6 +71,27 @@ class MicroWebSocket :
 
     # ----------------------------------------------------------------------------
 
+    @staticmethod
+    def _unmask(buf, length, mask) :
+        # XORs the first length bytes of the writable buffer buf in place
+        # with the 4-byte mask. Uses the viper emitter when the firmware
+        # has it, else XORs whole blocks as integers and the tail per byte.
+        if _unmaskViper :
+            _unmaskViper(buf, length, mask)
+            return
+        block = MicroWebSocket._unmaskBlock
+        wide  = int.from_bytes(bytes(mask) * (block // 4), 'little')
+        i     = 0
+        while i + block <= length :
+            v = int.from_bytes(buf[i:i+block], 'little') ^ wide
+            buf[i:i+block] = v.to_bytes(block, 'little')
+            i += block
+        while i < length :
+            buf[i] ^= mask[i & 3]
+            i += 1
+
+    # ----------------------------------------------------------------------------
+
     @staticmethod
     def _tryStartThread(func, args=()) :
         for x in range(10) :
@@ -72,6 +121,8 @@ class MicroWebSocket :
         self._httpCli           = httpClient
         self._closed            = True
         self._lock              = allocate_lock()
+        self._txHdr             = bytearray(10)
+        self._txBuf             = None
         self.RecvTextCallback   = None
         self.RecvBinaryCallback = None
         self.ClosedCallback     = None
@@ -84,6 +135,7 @@ class MicroWebSocket :
         if self._handshake(httpResponse) :
             self._ctrlBuf = MicroWebSocket._tryAllocByteArray(0x7D)
             self._msgBuf  = MicroWebSocket._tryAllocByteArray(maxRecvLen)
+            self._txBuf   = MicroWebSocket._tryAllocByteArray(2 + self._sendSmallMax)
             if self._ctrlBuf and self._msgBuf :
                 self._msgType = None
                 self._msgLen  = 0
@@ -162,7 +214,10 @@ class MicroWebSocket :
                     return False
                 length = (b[0] << 8) + b[1]
             elif length == 0x7F :
-                return False
+                b = self._socketfile.read(8)
+                if not b or len(b) != 8 :
+                    return False
+                length = int.from_bytes(b, 'big')
 
             mask = self._socketfile.read(4) if masked else None
             if masked and (not mask or len(mask) != 4) :
@@ -180,9 +235,7 @@ class MicroWebSocket :
                     if x != length :
                         return False
                     if masked :
-                        for i in range(length) :
-                            idx = self._msgLen + i
-                            self._msgBuf[idx] ^= mask[i%4]
+                        MicroWebSocket._unmask(buf, length, mask)
                     self._msgLen += length
                     if fin :
                         b = bytes(memoryview(self._msgBuf)[:self._msgLen])
@@ -226,32 +279,97 @@ class MicroWebSocket :
 
     # ----------------------------------------------------------------------------
 
+    def _packHeader(self, opcode, dataLen, fin) :
+        # Builds the frame header in the preallocated _txHdr, returns its size
+        h    = self._txHdr
+        h[0] = (0x80 | opcode) if fin else opcode
+        if dataLen < 0x7E :
+            h[1] = dataLen
+            return 2
+        if dataLen <= 0xFFFF :
+            h[1] = 0x7E
+            h[2] = dataLen >> 8
+            h[3] = dataLen & 0xFF
+            return 4
+        h[1] = 0x7F
+        for i in range(8) :
+            h[9-i] = (dataLen >> (8*i)) & 0xFF
+        return 10
+
+    # ----------------------------------------------------------------------------
+
+    def _writeFrame(self, opcode, data=None, fin=True) :
+        # Writes one frame, caller must hold _lock
+        dataLen = 0 if data is None else len(data)
+        hdrLen  = self._packHeader(opcode, dataLen, fin)
+        if dataLen <= self._sendSmallMax and self._txBuf :
+            # Header and payload leave in a single write
+            buf = self._txBuf
+            buf[0:hdrLen] = self._txHdr[0:hdrLen]
+            if dataLen > 0 :
+                buf[hdrLen:hdrLen+dataLen] = data
+            ret = self._socketfile.write(memoryview(buf)[:hdrLen+dataLen]) == hdrLen + dataLen
+        else :
+            ret = self._socketfile.write(memoryview(self._txHdr)[:hdrLen]) == hdrLen
+            if ret and dataLen > 0 :
+                ret = self._socketfile.write(data) == dataLen
+        if self._socketfile is not self._socket :
+            self._socketfile.flush()   # CPython needs flush to continue protocol
+        return ret
+
+    # ----------------------------------------------------------------------------
+
     def _sendFrame(self, opcode, data=None, fin=True) :
         if not self._closed and opcode >= 0x00 and opcode <= 0x0F :
-            dataLen = 0 if not data else len(data)
-            if dataLen <= 0xFFFF :
-                b1 = (0x80 | opcode) if fin else opcode
-                b2 = 0x7E if dataLen >= 0x7E else dataLen
-                self._lock.acquire()
-                try :
-                    if self._socketfile.write(pack('>BB', b1, b2)) == 2 :
-                        if dataLen > 0 :
-                            if dataLen >= 0x7E :
-                                self._socketfile.write(pack('>H', dataLen))
-                            ret = self._socketfile.write(data) == dataLen
-                        else :
-                            ret = True
-                        if self._socketfile is not self._socket :
-                            self._socketfile.flush()   # CPython needs flush to continue protocol
-                        self._lock.release()
-                        return ret
-                except :
-                    pass
+            self._lock.acquire()
+            try :
+                return self._writeFrame(opcode, data, fin)
+            except :
+                pass
+            finally :
                 self._lock.release()
         return False
 
     # ----------------------------------------------------------------------------
 
+    def SendStream(self, source, binary=True, chunkSize=None) :
+        # Sends one message as a series of fragments without holding it in
+        # memory. source is a stream with readinto() (file, socket, ...) read
+        # through one preallocated chunk buffer, or an iterable of str/bytes
+        # chunks. The message ends with an empty final continuation frame.
+        if self._closed :
+            return False
+        opcode = self._opBinFrame if binary else self._opTextFrame
+        self._lock.acquire()
+        try :
+            if hasattr(source, 'readinto') :
+                chunk = MicroWebSocket._tryAllocByteArray(chunkSize or self._streamChunk)
+                if not chunk :
+                    return False
+                view = memoryview(chunk)
+                while True :
+                    n = source.readinto(chunk)
+                    if not n :
+                        break
+                    if not self._writeFrame(opcode, view[:n], False) :
+                        return False
+                    opcode = self._opContFrame
+            else :
+                for data in source :
+                    if isinstance(data, str) :
+                        data = data.encode()
+                    if data :
+                        if not self._writeFrame(opcode, data, False) :
+                            return False
+                        opcode = self._opContFrame
+            return self._writeFrame(opcode, None, True)
+        except :
+            return False
+        finally :
+            self._lock.release()
+
+    # ----------------------------------------------------------------------------
+
     def SendText(self, msg) :
         return self._sendFrame(self._opTextFrame, msg.encode())
 
@@ -0,0 +1,286 @@
+"""
+Asynchronous WebSocket Module for ESP32 IoT Control System
+=========================================================
+
+WebSocket (RFC 6455) framing on top of uasyncio streams, so the
+production ``WebServer`` can upgrade a request to a long-lived socket
+without the threads used by ``MicroWebSocket``. The handshake constant
+and opcodes are shared with ``lib/MicroWebServ/microWebSocket.py``.
+
+Author: Erfan Mohamadnia
+License: MIT
+Version: 1.0.0
+
+Features:
+- Server-side handshake from already parsed request headers
+- Text and binary messages with fragment reassembly
+- Automatic pong replies and close handshake
+- Bounded incoming message size
+- Frame writes are serialized by a lock held across header, payload
+  and drain, so the event pusher and the ack loop never interleave
+- Write and idle deadlines, so a client that stops reading or goes
+  silent cannot hold the connection forever
+- Pre-encoded text messages are sent without copying, so one event
+  payload can be shared by many sockets
+
+Usage Example:
+    ws = AsyncWebSocket(reader, writer)
+    if await ws.handshake(request.headers):
+        message = await ws.recv()
+        await ws.send("hello")
+        await ws.close()
+"""
+
+from hashlib import sha1
+from binascii import b2a_base64
+import ustruct as struct
+import uasyncio as asyncio
+
+from lib.MicroWebServ.microWebSocket import MicroWebSocket
+
+
+OP_CONT = MicroWebSocket._opContFrame
+OP_TEXT = MicroWebSocket._opTextFrame
+OP_BINARY = MicroWebSocket._opBinFrame
+OP_CLOSE = MicroWebSocket._opCloseFrame
+OP_PING = MicroWebSocket._opPingFrame
+OP_PONG = MicroWebSocket._opPongFrame
+
+
+class AsyncWebSocket:
+    """
+    Server end of a WebSocket connection on uasyncio streams.
+
+    Attributes:
+        max_message (int): Largest accepted incoming message in bytes
+        write_timeout (float or None): Seconds a frame may take to drain
+        idle_timeout (float or None): Seconds recv() waits for any frame
+        closed (bool): True once a close frame was sent, the stream ended
+            or a deadline expired
+    """
+
+    def __init__(self, reader, writer, max_message=512, write_timeout=None, idle_timeout=None):
+        """
+        Wrap an accepted connection.
+
+        Args:
+            reader: AsyncIO stream reader of the connection
+            writer: AsyncIO stream writer of the connection
+            max_message (int): Largest accepted incoming message in bytes
+            write_timeout (float, optional): Seconds a frame may take to
+                drain; a client that stops reading is dropped after it
+            idle_timeout (float, optional): Seconds recv() waits for the
+                next frame (pongs included) before giving up on the peer
+        """
+        self.reader = reader
+        self.writer = writer
+        self.max_message = max_message
+        self.write_timeout = write_timeout
+        self.idle_timeout = idle_timeout
+        self.closed = False
+        self._stalled = False  # A drain timed out; nothing more can be sent
+        self._write_lock = asyncio.Lock()
+
+    @staticmethod
+    def accept_key(key):
+        """
+        Compute the Sec-WebSocket-Accept value for a client key.
+
+        Args:
+            key (str): Sec-WebSocket-Key header of the request
+
+        Returns:
+            str: Base64 encoded SHA-1 digest
+        """
+        digest = sha1((key + MicroWebSocket._handshakeSign).encode()).digest()
+        return b2a_base64(digest).decode().strip()
+
+    async def handshake(self, headers):
+        """
+        Answer the upgrade request with 101 Switching Protocols.
+
+        Args:
+            headers (dict): Request headers with lower-cased names
+
+        Returns:
+            bool: True if the request was a valid WebSocket upgrade
+        """
+        key = headers.get('sec-websocket-key')
+        if not key or headers.get('upgrade', '').lower() != 'websocket':
+            return False
+        self.writer.write(("HTTP/1.1 101 Switching Protocols\r\n"
+                           "Upgrade: websocket\r\nConnection: Upgrade\r\n"
+                           f"Sec-WebSocket-Accept: {self.accept_key(key)}\r\n\r\n").encode())
+        await asyncio.wait_for(self.writer.drain(), self.write_timeout)
+        return True
+
+    async def _send_frame(self, opcode, payload=b''):
+        """
+        Write one unmasked, final frame.
+
+        Several coroutines send on the same socket (event pusher, command
+        acks, pong replies), so the whole frame is written and drained
+        under the write lock. The drain is bounded by ``write_timeout``;
+        once it expires the socket is marked closed and every later send
+        fails at once instead of queueing behind the lock.
+
+        Args:
+            opcode (int): Frame opcode
+            payload (bytes): Frame payload
+
+        Raises:
+            OSError: If the socket stalled or the drain timed out
+        """
+        length = len(payload)
+        if length < 0x7E:
+            header = struct.pack('>BB', 0x80 | opcode, length)
+        elif length <= 0xFFFF:
+            header = struct.pack('>BBH', 0x80 | opcode, 0x7E, length)
+        else:
+            header = struct.pack('>BBQ', 0x80 | opcode, 0x7F, length)
+        async with self._write_lock:
+            if self._stalled:
+                raise OSError("WebSocket stalled")
+            self.writer.write(header)
+            if length:
+                self.writer.write(payload)
+            try:
+                await asyncio.wait_for(self.writer.drain(), self.write_timeout)
+            except asyncio.TimeoutError:
+                self._stalled = True
+                self.closed = True
+                raise OSError("WebSocket write timed out")
+
+    async def send(self, message):
+        """
+        Send a text (str) or binary (bytes) message.
+
+        Args:
+            message (str or bytes): Message to send
+        """
+        if self.closed:
+            raise OSError("WebSocket closed")
+        if isinstance(message, str):
+            await self._send_frame(OP_TEXT, message.encode('utf-8'))
+        else:
+            await self._send_frame(OP_BINARY, bytes(message))
+
+    async def send_text(self, payload):
+        """
+        Send a text message that is already UTF-8 encoded.
+
+        The payload is written as is, so shared bytes (e.g. an event bus
+        event) are not copied per socket.
+
+        Args:
+            payload (bytes): UTF-8 encoded message text
+        """
+        if self.closed:
+            raise OSError("WebSocket closed")
+        await self._send_frame(OP_TEXT, payload)
+
+    async def ping(self, payload=b''):
+        """
+        Send a ping frame to check that the peer is still there.
+
+        Args:
+            payload (bytes): Optional ping payload (at most 125 bytes)
+        """
+        if not self.closed:
+            await self._send_frame(OP_PING, payload)
+
+    async def close(self, code=1000):
+        """
+        Send a close frame if none was sent yet.
+
+        Args:
+            code (int): Close status code
+        """
+        if not self.closed:
+            self.closed = True
+            try:
+                await self._send_frame(OP_CLOSE, struct.pack('>H', code))
+            except OSError:
+                pass
+
+    async def _read_frame(self):
+        """
+        Read and unmask one frame.
+
+        Returns:
+            tuple: (fin, opcode, payload)
+
+        Raises:
+            ValueError: If the frame exceeds ``max_message``
+            EOFError: If the stream ended mid-frame
+        """
+        head = await self.reader.readexactly(2)
+        fin = head[0] & 0x80
+        opcode = head[0] & 0x0F
+        masked = head[1] & 0x80
+        length = head[1] & 0x7F
+
+        if length == 0x7E:
+            length = struct.unpack('>H', await self.reader.readexactly(2))[0]
+        elif length == 0x7F:
+            length = struct.unpack('>Q', await self.reader.readexactly(8))[0]
+        if length > self.max_message:
+            raise ValueError("WebSocket frame too large")
+
+        mask = await self.reader.readexactly(4) if masked else None
+        payload = bytearray(await self.reader.readexactly(length)) if length else bytearray()
+        if mask:
+            MicroWebSocket._unmask(payload, length, mask)
+        return fin, opcode, payload
+
+    async def recv(self):
+        """
+        Wait for the next complete message.
+
+        Control frames are handled here: pings are answered, a close
+        frame is acknowledged and ends the connection. If no frame at all
+        arrives within ``idle_timeout`` the peer is considered gone.
+
+        Returns:
+            str, bytes or None: Text message as str, binary message as
+            bytes, or None once the connection is closed
+        """
+        message = None
+        message_type = None
+        try:
+            while True:
+                fin, opcode, payload = await asyncio.wait_for(self._read_frame(),
+                                                              self.idle_timeout)
+
+                if opcode == OP_PING:
+                    await self._send_frame(OP_PONG, payload)
+                    continue
+                if opcode == OP_PONG:
+                    continue
+                if opcode == OP_CLOSE:
+                    await self.close()
+                    return None
+
+                if opcode != OP_CONT:
+                    message_type = opcode
+                    message = payload
+                elif message is None:
+                    raise ValueError("Continuation without a message")
+                else:
+                    message += payload
+                    if len(message) > self.max_message:
+                        raise ValueError("WebSocket message too large")
+
+                if fin:
+                    if message_type == OP_TEXT:
+                        return message.decode('utf-8')
+                    return bytes(message)
+        except ValueError:
+            await self.close(1009)
+            return None
+        except asyncio.TimeoutError:
+            await self.close(1001)
+            return None
+        except (EOFError, OSError):
+            self.closed = True
+            return None
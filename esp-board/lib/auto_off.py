@@ -0,0 +1,236 @@
+"""
+Auto-Off Deadline Service for ESP32 IoT Control System
+=====================================================
+
+Owns every relay auto-off deadline on the board. Scheduled tasks and
+timed HTTP requests arm deadlines through the same service, so a later
+request simply replaces or extends the deadline of an earlier one
+instead of racing it with a second timer.
+
+All deadlines live in one min-heap ordered by expiry time and are served
+by a single coroutine on the uasyncio event loop, replacing one hardware
+Timer or asyncio task per device.
+
+Author: Erfan Mohamadnia
+License: MIT
+Version: 1.0.0
+
+Features:
+- One coroutine for all channels, started with the web server or on first use
+- Arm, extend and cancel per relay channel
+- Remaining time query per channel and for all channels
+- Non-wrapping millisecond clock built from time.ticks_ms()
+- Expiry hook for keeping device status in sync
+- Change listener reporting every armed, cancelled or expired deadline
+
+Usage Example:
+    auto_off = AutoOffService(relay_controller)
+    auto_off.arm(0, 300)         # Relay 0 off in 5 minutes
+    auto_off.extend(0, 60)       # ... one minute later
+    auto_off.remaining(0)        # -> 360
+    auto_off.cancel(0)
+"""
+
+import time
+import uasyncio as asyncio
+import uheapq as heapq
+
+
+class AutoOffService:
+    """
+    Deadline scheduler that switches relays off when their time is up.
+
+    Each armed channel has one live entry in ``_deadlines``. The heap may
+    also hold superseded entries from earlier arm/extend calls; they are
+    recognized by their generation number and skipped when popped.
+
+    Attributes:
+        relay_controller: RelayController used to switch channels off
+        on_expire: Optional callable receiving the channel number after
+            a deadline switched it off
+        listener: Optional callable receiving (channel, seconds_left) on
+            every deadline change; seconds_left is None once cleared
+        max_sleep (int): Longest idle wait in seconds, which also keeps
+            the millisecond clock within ticks_diff() range
+    """
+
+    def __init__(self, relay_controller, max_sleep=3600):
+        """
+        Initialize the service without any armed deadlines.
+
+        Args:
+            relay_controller: RelayController instance
+            max_sleep (int): Longest idle wait in seconds
+        """
+        self.relay_controller = relay_controller
+        self.on_expire = None
+        self.listener = None
+        self.max_sleep = max_sleep
+        self._heap = []        # (deadline_ms, generation, channel)
+        self._deadlines = {}   # channel -> (deadline_ms, generation)
+        self._generation = 0
+        self._clock_ms = 0
+        self._last_ticks = time.ticks_ms()
+        self._event = asyncio.Event()
+        self._task = None
+
+    def now_ms(self):
+        """
+        Read the service clock.
+
+        Accumulates ticks_ms() differences so the value never wraps. The
+        service loop wakes at least every ``max_sleep`` seconds once
+        started, which keeps each difference within ticks_diff() range.
+
+        Returns:
+            int: Milliseconds since the service was created
+        """
+        ticks = time.ticks_ms()
+        self._clock_ms += time.ticks_diff(ticks, self._last_ticks)
+        self._last_ticks = ticks
+        return self._clock_ms
+
+    def _schedule(self, channel, deadline_ms):
+        """
+        Store a new deadline for a channel and wake the service loop.
+
+        Args:
+            channel (int): Relay channel number
+            deadline_ms (int): Expiry time on the service clock
+        """
+        self._generation += 1
+        self._deadlines[channel] = (deadline_ms, self._generation)
+        heapq.heappush(self._heap, (deadline_ms, self._generation, channel))
+        self.start()
+        self._event.set()
+        if self.listener:
+            self.listener(channel, max(0, (deadline_ms - self.now_ms() + 999) // 1000))
+
+    def arm(self, channel, duration):
+        """
+        Switch a channel off after a delay, replacing any earlier deadline.
+
+        Args:
+            channel (int): Relay channel number
+            duration (int): Seconds until the channel is switched off
+        """
+        self._schedule(channel, self.now_ms() + int(duration * 1000))
+
+    def extend(self, channel, seconds):
+        """
+        Push back the deadline of an armed channel.
+
+        Args:
+            channel (int): Relay channel number
+            seconds (int): Seconds to add to the current deadline
+
+        Returns:
+            bool: True if the channel was armed and has been extended
+        """
+        entry = self._deadlines.get(channel)
+        if entry is None:
+            return False
+        self._schedule(channel, entry[0] + int(seconds * 1000))
+        return True
+
+    def cancel(self, channel):
+        """
+        Drop the deadline of a channel without switching it.
+
+        Args:
+            channel (int): Relay channel number
+
+        Returns:
+            bool: True if a deadline was cancelled
+        """
+        # The heap entry becomes stale and is skipped when it comes up
+        if self._deadlines.pop(channel, None) is None:
+            return False
+        if self.listener:
+            self.listener(channel, None)
+        return True
+
+    def remaining(self, channel):
+        """
+        Get the time left before a channel is switched off.
+
+        Args:
+            channel (int): Relay channel number
+
+        Returns:
+            int or None: Whole seconds left (rounded up), or None if the
+            channel has no deadline
+        """
+        entry = self._deadlines.get(channel)
+        if entry is None:
+            return None
+        left_ms = entry[0] - self.now_ms()
+        return max(0, (left_ms + 999) // 1000)
+
+    def snapshot(self):
+        """
+        Get the remaining time of every armed channel.
+
+        Returns:
+            dict: Channel number -> whole seconds left
+        """
+        now = self.now_ms()
+        return {channel: max(0, (deadline - now + 999) // 1000)
+                for channel, (deadline, _) in self._deadlines.items()}
+
+    def _expire_due(self):
+        """
+        Switch off every channel whose deadline has passed.
+
+        Returns:
+            int or None: Milliseconds until the next live deadline, or
+            None if nothing is armed
+        """
+        now = self.now_ms()
+        heap = self._heap
+        while heap:
+            deadline, generation, channel = heap[0]
+            if self._deadlines.get(channel) != (deadline, generation):
+                heapq.heappop(heap)  # Superseded or cancelled
+                continue
+            if deadline > now:
+                return deadline - now
+            heapq.heappop(heap)
+            del self._deadlines[channel]
+            self.relay_controller.off(channel)
+            print(f"⏲️ Auto-off: relay {channel} switched off")
+            if self.on_expire:
+                self.on_expire(channel)
+            if self.listener:
+                self.listener(channel, None)
+        return None
+
+    async def _run(self):
+        """
+        Expire deadlines, then sleep until the next one or a new arm call.
+        """
+        while True:
+            wait_ms = self._expire_due()
+            if wait_ms is None:
+                delay = self.max_sleep
+            else:
+                delay = min(wait_ms / 1000, self.max_sleep)
+
+            self._event.clear()
+            try:
+                await asyncio.wait_for(self._event.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        """Start the service loop if it is not running yet."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        """Cancel the service loop and forget all deadlines."""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        self._heap = []
+        self._deadlines = {}
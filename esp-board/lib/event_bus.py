@@ -0,0 +1,266 @@
+"""
+Event Bus Module for ESP32 IoT Control System
+============================================
+
+Broadcast hub delivering device state changes to streaming clients.
+Server-Sent Events and WebSocket connections both register here;
+hardware components report changes through their ``listener`` hooks and
+each connection drains its own queue at its own pace.
+
+Every event belongs to one topic (relays, servo, tasks or system) and a
+subscriber only receives the topics it asked for. An event is encoded
+to JSON once when it is published; all subscribers share that Event
+object and its cached SSE and WebSocket wire forms, so the cost of an
+update does not grow with the number of clients.
+
+Per-subscriber queues are bounded and coalescing: an event carrying the
+same key as one still waiting in the queue replaces it in place, so a
+slow client only ever sees the latest relay mask or servo position. If
+the queue is still full, the oldest event is dropped and the subscriber
+is told to resynchronize from /status.
+
+Author: Erfan Mohamadnia
+License: MIT
+Version: 1.0.0
+
+Features:
+- Publish/subscribe for device state events with per-topic filtering
+- Serialize-once fanout of shared event bytes to SSE and WebSocket clients
+- Cap on concurrent subscribers
+- Bounded per-subscriber queue with key-based coalescing
+- Overflow detection with a single "resync" event
+- Non-blocking publish, safe to call from any handler or task
+
+Usage Example:
+    bus = EventBus(queue_size=16, max_subscribers=10)
+    subscription = bus.subscribe(('relays', 'servo'))
+    bus.publish('relays', {'mask': 5})
+    event = await subscription.get()
+    writer.write(event.sse())
+    bus.unsubscribe(subscription)
+"""
+
+import ujson as json
+import uasyncio as asyncio
+
+
+# Topics a subscriber can select
+TOPICS = ('relays', 'servo', 'tasks', 'system')
+
+# Topic of each published event name; unlisted events go to "system"
+EVENT_TOPICS = {
+    'relays': 'relays',
+    'auto_off': 'relays',
+    'servo': 'servo',
+    'tasks': 'tasks',
+    'task_run': 'tasks',
+}
+
+
+def parse_topics(spec):
+    """
+    Parse a comma-separated topic selection.
+
+    Args:
+        spec (str or None): Topics such as "relays,servo"; empty or None
+            selects every topic
+
+    Returns:
+        tuple: Selected topic names
+
+    Raises:
+        ValueError: If an unknown topic is named
+    """
+    if not spec:
+        return TOPICS
+    topics = tuple(topic.strip() for topic in spec.split(',') if topic.strip())
+    for topic in topics:
+        if topic not in TOPICS:
+            raise ValueError(f"Unknown topic: {topic}")
+    return topics or TOPICS
+
+
+class Event:
+    """
+    Published event, encoded once and shared by every subscriber.
+
+    Attributes:
+        topic (str): Topic the event belongs to
+        name (str): Event name, e.g. "relays" or "auto_off"
+        payload (bytes): JSON encoded event data
+    """
+
+    def __init__(self, topic, name, data):
+        """
+        Encode an event.
+
+        Args:
+            topic (str): Topic the event belongs to
+            name (str): Event name
+            data (dict): JSON-serializable payload
+        """
+        self.topic = topic
+        self.name = name
+        self.payload = json.dumps(data).encode('utf-8')
+        self._sse = None
+        self._ws = None
+
+    def sse(self):
+        """
+        Get the Server-Sent Events form, built on first use.
+
+        Returns:
+            bytes: "event: <name>\\ndata: <json>\\n\\n"
+        """
+        if self._sse is None:
+            self._sse = b"event: " + self.name.encode() + b"\ndata: " + self.payload + b"\n\n"
+        return self._sse
+
+    def ws(self):
+        """
+        Get the WebSocket text message form, built on first use.
+
+        Returns:
+            bytes: UTF-8 encoded "E <name> <json>"
+        """
+        if self._ws is None:
+            self._ws = b"E " + self.name.encode() + b" " + self.payload
+        return self._ws
+
+
+class Subscription:
+    """
+    Bounded, coalescing event queue of one subscriber.
+
+    Attributes:
+        queue_size (int): Maximum number of pending events
+        topics (tuple): Topics delivered to this subscriber
+        dropped (int): Events discarded because the queue was full
+    """
+
+    def __init__(self, queue_size, topics=TOPICS):
+        """
+        Initialize an empty queue.
+
+        Args:
+            queue_size (int): Maximum number of pending events
+            topics (tuple): Topics delivered to this subscriber
+        """
+        self.queue_size = queue_size
+        self.topics = topics
+        self.dropped = 0
+        self._order = []    # Pending keys, oldest first
+        self._pending = {}  # key -> Event
+        self._resync = False
+        self._ready = asyncio.Event()
+
+    def put(self, key, event):
+        """
+        Queue an event without blocking.
+
+        Args:
+            key (str): Coalescing key; a pending event with the same key
+                is replaced
+            event (Event): Shared encoded event
+        """
+        if key not in self._pending:
+            if len(self._order) >= self.queue_size:
+                oldest = self._order.pop(0)
+                del self._pending[oldest]
+                self.dropped += 1
+                self._resync = True
+            self._order.append(key)
+        self._pending[key] = event
+        self._ready.set()
+
+    async def get(self):
+        """
+        Wait for the next event.
+
+        After an overflow a "resync" system event is returned first so the
+        client knows it missed updates.
+
+        Returns:
+            Event: Next pending event
+        """
+        while not self._order and not self._resync:
+            self._ready.clear()
+            await self._ready.wait()
+
+        if self._resync:
+            self._resync = False
+            return Event('system', 'resync', {"dropped": self.dropped})
+
+        key = self._order.pop(0)
+        return self._pending.pop(key)
+
+
+class EventBus:
+    """
+    Fan-out of device state events to all current subscribers.
+
+    Attributes:
+        queue_size (int): Queue length given to new subscriptions
+        max_subscribers (int): Largest number of concurrent subscribers
+        subscribers (list): Active Subscription objects
+    """
+
+    def __init__(self, queue_size=16, max_subscribers=10):
+        """
+        Initialize a bus without subscribers.
+
+        Args:
+            queue_size (int): Queue length given to new subscriptions
+            max_subscribers (int): Largest number of concurrent subscribers
+        """
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self.subscribers = []
+
+    def subscribe(self, topics=TOPICS):
+        """
+        Register a new subscriber.
+
+        Args:
+            topics (tuple): Topics to receive, see ``TOPICS``
+
+        Returns:
+            Subscription or None: Queue receiving every matching event
+            published from now on, or None if the subscriber cap is reached
+        """
+        if len(self.subscribers) >= self.max_subscribers:
+            return None
+        subscription = Subscription(self.queue_size, topics)
+        self.subscribers.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """
+        Remove a subscriber.
+
+        Args:
+            subscription (Subscription): Subscription returned by subscribe()
+        """
+        if subscription in self.subscribers:
+            self.subscribers.remove(subscription)
+
+    def publish(self, event, data, key=None):
+        """
+        Queue an event for every subscriber of its topic.
+
+        The payload is encoded once, and only if someone is listening.
+
+        Args:
+            event (str): Event name, e.g. "relays" or "servo"
+            data (dict): JSON-serializable payload
+            key (str, optional): Coalescing key, defaults to the event name
+        """
+        if not self.subscribers:
+            return
+        topic = EVENT_TOPICS.get(event, 'system')
+        encoded = None
+        for subscription in self.subscribers:
+            if topic in subscription.topics:
+                if encoded is None:
+                    encoded = Event(topic, event, data)
+                subscription.put(key or event, encoded)
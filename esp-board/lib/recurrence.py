@@ -0,0 +1,286 @@
+"""
+Recurrence Rules Module for ESP32 IoT Control System
+===================================================
+
+Computes occurrences of recurring task schedules on the device. A
+recurring task is stored once with its rule and only its next occurrence
+is kept in the task index; the scheduler asks for the following one each
+time it fires, so a daily watering cycle costs a single stored task
+instead of one task per day.
+
+Author: Erfan Mohamadnia
+License: MIT
+Version: 1.0.0
+
+Features:
+- Daily and weekly schedules with a day-of-week mask
+- Fixed intervals in minutes (every N minutes from a start time)
+- Cron subset: minute hour day-of-month month day-of-week with
+  "*", lists "1,3", ranges "1-5" and steps "*/15" or "8-18/2"
+- Rule validation with normalized, JSON-serializable output
+- Compiled cron fields cached as bitmasks for fast matching
+
+Rule Format:
+    {"type": "daily"}                               # Every day at the task time
+    {"type": "weekly", "days": [0, 2, 4]}           # Mon/Wed/Fri (0 = Monday)
+    {"type": "interval", "minutes": 30}             # Every 30 minutes from the start
+    {"type": "cron", "expr": "0 6,18 * * 1-5"}      # 06:00 and 18:00 on weekdays
+
+Usage Example:
+    rule = parse_rule({"type": "weekly", "days": [5, 6]})
+    start, ok = parse_task_time('2024-06-01', '07:30')
+    next_ts = next_occurrence(rule, start, time.time())
+"""
+
+import time
+
+
+DAY_SECONDS = 86400
+ALL_DAYS = 0x7F  # Monday (bit 0) .. Sunday (bit 6)
+CRON_SEARCH_DAYS = 1462  # Four years, enough for rules that only match Feb 29
+
+# (low, high) bounds of the five cron fields
+_CRON_FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+_cron_cache = {}  # Cron expression -> compiled field masks
+
+
+def parse_rule(spec):
+    """
+    Validate a recurrence rule and return its normalized form.
+
+    Args:
+        spec (dict): Rule as received from the API (see module docstring)
+
+    Returns:
+        dict: Normalized rule suitable for storage and next_occurrence()
+
+    Raises:
+        ValueError: If the rule type or any of its fields is invalid
+    """
+    if not isinstance(spec, dict):
+        raise ValueError("Repeat rule must be an object")
+
+    rule_type = spec.get('type')
+    if rule_type == 'daily':
+        return {"type": "weekly", "days": ALL_DAYS}
+
+    if rule_type == 'weekly':
+        days = spec.get('days')
+        if isinstance(days, int) and not isinstance(days, bool):
+            mask = days
+        elif isinstance(days, list) and days:
+            mask = 0
+            for day in days:
+                if not isinstance(day, int) or not 0 <= day <= 6:
+                    raise ValueError("Weekly days must be 0 (Monday) to 6 (Sunday)")
+                mask |= 1 << day
+        else:
+            raise ValueError("Weekly rule needs a list of days")
+        if not 0 < mask <= ALL_DAYS:
+            raise ValueError("Weekly day mask must select at least one day")
+        return {"type": "weekly", "days": mask}
+
+    if rule_type == 'interval':
+        try:
+            minutes = int(spec.get('minutes'))
+        except (TypeError, ValueError):
+            raise ValueError("Interval rule needs a number of minutes")
+        if minutes <= 0:
+            raise ValueError("Interval must be at least 1 minute")
+        return {"type": "interval", "minutes": minutes}
+
+    if rule_type == 'cron':
+        expr = spec.get('expr')
+        if not isinstance(expr, str):
+            raise ValueError("Cron rule needs an expression")
+        expr = ' '.join(expr.split())
+        _compile_cron(expr)
+        return {"type": "cron", "expr": expr}
+
+    raise ValueError(f"Unknown repeat type: {rule_type}")
+
+
+def next_occurrence(rule, start, after):
+    """
+    Find the first occurrence of a rule later than a timestamp.
+
+    Occurrences never precede the task's start time. Daily and weekly
+    rules fire at the hour and minute of the start time.
+
+    Args:
+        rule (dict): Normalized rule from parse_rule()
+        start (int): Start timestamp of the recurring task
+        after (int): Occurrence must be strictly later than this timestamp
+
+    Returns:
+        int or None: Timestamp of the next occurrence, or None if the rule
+        never matches again
+    """
+    rule_type = rule['type']
+
+    if rule_type == 'interval':
+        if after < start:
+            return start
+        period = rule['minutes'] * 60
+        return start + ((after - start) // period + 1) * period
+
+    earliest = max(start, after + 1)
+
+    if rule_type == 'weekly':
+        start_time = time.localtime(start)
+        offset = start_time[3] * 3600 + start_time[4] * 60
+        day_ts = _day_start(earliest)
+        for _ in range(8):
+            weekday = time.localtime(day_ts)[6]
+            candidate = day_ts + offset
+            if candidate >= earliest and rule['days'] & (1 << weekday):
+                return candidate
+            day_ts += DAY_SECONDS
+        return None
+
+    if rule_type == 'cron':
+        return _next_cron(_compile_cron(rule['expr']), earliest)
+
+    return None
+
+
+def _day_start(timestamp):
+    """
+    Get the timestamp of midnight on the day containing a timestamp.
+
+    Args:
+        timestamp (int): Any timestamp
+
+    Returns:
+        int: Timestamp of 00:00 on the same day
+    """
+    t = time.localtime(timestamp)
+    return int(time.mktime((t[0], t[1], t[2], 0, 0, 0, 0, 0)))
+
+
+def _compile_cron(expr):
+    """
+    Compile a five-field cron expression into bitmasks.
+
+    Args:
+        expr (str): Cron expression with single-space separated fields
+
+    Returns:
+        tuple: (minutes, hours, days, months, weekdays, dom_any, dow_any)
+        where the first five are bitmasks and the flags mark fields
+        given as "*"
+
+    Raises:
+        ValueError: If the expression is malformed
+    """
+    compiled = _cron_cache.get(expr)
+    if compiled is not None:
+        return compiled
+
+    fields = expr.split(' ')
+    if len(fields) != 5:
+        raise ValueError("Cron expression needs 5 fields")
+
+    masks = []
+    for field, (low, high) in zip(fields, _CRON_FIELDS):
+        masks.append(_parse_cron_field(field, low, high))
+
+    # Cron weekdays count from Sunday and accept 7 for Sunday as well
+    weekdays = masks[4]
+    if weekdays & (1 << 7):
+        weekdays = (weekdays | 1) & ~(1 << 7)
+
+    compiled = (masks[0], masks[1], masks[2], masks[3], weekdays,
+                fields[2] == '*', fields[4] == '*')
+    _cron_cache[expr] = compiled
+    return compiled
+
+
+def _parse_cron_field(field, low, high):
+    """
+    Parse one cron field into a bitmask of allowed values.
+
+    Args:
+        field (str): Field text, e.g. "*", "5", "1-5", "*/10", "0,30"
+        low (int): Smallest allowed value
+        high (int): Largest allowed value
+
+    Returns:
+        int: Bitmask with bit n set when value n is allowed
+
+    Raises:
+        ValueError: If the field is malformed or out of range
+    """
+    mask = 0
+    for part in field.split(','):
+        step = 1
+        if '/' in part:
+            part, step_text = part.split('/', 1)
+            step = int(step_text)
+            if step <= 0:
+                raise ValueError(f"Invalid cron step: {field}")
+
+        if part == '*':
+            first, last = low, high
+        elif '-' in part:
+            first_text, last_text = part.split('-', 1)
+            first, last = int(first_text), int(last_text)
+        else:
+            first = last = int(part)
+
+        if not low <= first <= last <= high:
+            raise ValueError(f"Cron field out of range: {field}")
+
+        for value in range(first, last + 1, step):
+            mask |= 1 << value
+    return mask
+
+
+def _next_cron(compiled, earliest):
+    """
+    Find the first minute at or after a timestamp matching a cron rule.
+
+    Days are scanned one at a time and hours/minutes only on matching
+    days, so even sparse rules resolve in a few thousand cheap checks.
+
+    Args:
+        compiled (tuple): Result of _compile_cron()
+        earliest (int): Lower bound timestamp
+
+    Returns:
+        int or None: Matching timestamp, or None if nothing matches
+        within CRON_SEARCH_DAYS
+    """
+    minutes, hours, days, months, weekdays, dom_any, dow_any = compiled
+
+    # Round up to a whole minute
+    earliest = (earliest + 59) // 60 * 60
+
+    day_ts = _day_start(earliest)
+    first_minute = (earliest - day_ts) // 60
+
+    for _ in range(CRON_SEARCH_DAYS):
+        t = time.localtime(day_ts)
+        if months & (1 << t[1]):
+            dom_ok = days & (1 << t[2])
+            dow_ok = weekdays & (1 << ((t[6] + 1) % 7))  # localtime: 0 = Monday
+            if dom_any or dow_any:
+                day_ok = dom_ok and dow_ok
+            else:
+                day_ok = dom_ok or dow_ok  # Standard cron: either field may match
+
+            if day_ok:
+                for hour in range(first_minute // 60, 24):
+                    if not hours & (1 << hour):
+                        continue
+                    minute = first_minute % 60 if hour == first_minute // 60 else 0
+                    while minute < 60:
+                        if minutes & (1 << minute):
+                            return day_ts + hour * 3600 + minute * 60
+                        minute += 1
+
+        day_ts += DAY_SECONDS
+        first_minute = 0
+
+    return None
@@ -14,6 +14,9 @@ Features:
 - Multi-channel relay control via GPIO pins
 - Individual relay on/off control
 - Group operations (all on/all off)
+- Bitmask API applying many channel changes in one GPIO register write
+  (opt-in, classic ESP32 only)
+- Cached relay state word readable without touching the pins
 - Active-low relay logic support
 - Safe initialization with all relays off
 
@@ -28,10 +31,41 @@ Usage Example:
     controller.on(0)    # Turn on relay 0
     controller.off(1)   # Turn off relay 1
     controller.off_all() # Turn off all relays
+    controller.apply_mask(0b0101, 0b0010)  # Relays 0 and 2 on, relay 1 off
+    controller.state()   # -> 0b0101
 """
 
+import os
 from machine import Pin
 
+try:
+    from machine import mem32
+except ImportError:
+    mem32 = None
+
+# ESP32 GPIO output "write 1 to set" / "write 1 to clear" registers (GPIO 0-31).
+# These addresses are only valid on the original ESP32; the S2, S3 and C3
+# map their GPIO block elsewhere.
+GPIO_OUT_W1TS_REG = 0x3FF44008
+GPIO_OUT_W1TC_REG = 0x3FF4400C
+
+
+def _is_classic_esp32():
+    """
+    Check whether the firmware runs on the original ESP32 chip.
+    
+    sys.platform is "esp32" on every ESP32 variant, but os.uname().machine
+    names the chip, e.g. "Generic ESP32 module with ESP32" versus
+    "... with ESP32S3" or "... with ESP32C3".
+    
+    Returns:
+        bool: True on the original ESP32
+    """
+    try:
+        return os.uname().machine.endswith('with ESP32')
+    except AttributeError:
+        return False
+
 
 class RelayController:
     """
@@ -41,11 +75,21 @@ class RelayController:
     providing methods for individual and group control. Assumes active-low
     relay logic where LOW signal activates the relay.
     
+    Relay state is cached as a bitmask (bit n set = channel n ON). When
+    register writes are enabled, the chip is an original ESP32 and every
+    relay pin is below GPIO 32, changes are written to the GPIO set/clear
+    registers so all affected relays switch at the same instant; otherwise
+    (the default) each pin is written through Pin.value().
+    
     Attributes:
         relays (list): List of Pin objects for relay control
+        pins (list): GPIO pin numbers, indexed by channel
+        use_registers (bool): True if the register fast path is active
+        listener: Optional callable receiving the new state bitmask
+            whenever a switch changes it
     """
     
-    def __init__(self, pins):
+    def __init__(self, pins, use_registers=False):
         """
         Initialize relay controller with specified GPIO pins.
         
@@ -55,12 +99,113 @@ class RelayController:
         
         Args:
             pins (list): List of GPIO pin numbers for relay control
+            use_registers (bool): Allow direct GPIO register writes on the
+                original ESP32 (default: False)
         """
-        self.relays = [Pin(pin, Pin.OUT) for pin in pins]
+        self.pins = list(pins)
+        self.relays = [Pin(pin, Pin.OUT) for pin in self.pins]
         
         # Initialize all relays to OFF state (active-low logic)
         for relay in self.relays:
             relay.value(1)  # HIGH = OFF for active-low relays
+        
+        self._state = 0  # Bit n set = channel n ON
+        self.listener = None  # Called with the new state mask after a change
+        self._all_mask = (1 << len(self.pins)) - 1
+        self.use_registers = (use_registers and mem32 is not None and
+                              _is_classic_esp32() and
+                              all(pin < 32 for pin in self.pins))
+        
+        # Channel bitmask -> GPIO bitmask lookup for small relay banks
+        self._gpio_lut = None
+        if self.use_registers and len(self.pins) <= 8:
+            self._gpio_lut = [self._to_gpio_mask(mask) for mask in range(self._all_mask + 1)]
+    
+    def _to_gpio_mask(self, mask):
+        """
+        Convert a channel bitmask to the matching GPIO register bitmask.
+        
+        Args:
+            mask (int): Channel bitmask
+            
+        Returns:
+            int: Bitmask with one bit per affected GPIO pin
+        """
+        gpio_mask = 0
+        for channel, pin in enumerate(self.pins):
+            if mask & (1 << channel):
+                gpio_mask |= 1 << pin
+        return gpio_mask
+    
+    def apply_mask(self, on_mask, off_mask):
+        """
+        Switch many relay channels in one operation.
+        
+        Channels whose bit is set in ``on_mask`` are turned on and those in
+        ``off_mask`` are turned off; all other channels keep their state.
+        Bits beyond the configured channel count are ignored.
+        
+        Args:
+            on_mask (int): Bitmask of channels to turn on
+            off_mask (int): Bitmask of channels to turn off
+            
+        Returns:
+            int: New relay state bitmask
+            
+        Raises:
+            ValueError: If a channel is present in both masks
+        """
+        on_mask &= self._all_mask
+        off_mask &= self._all_mask
+        if on_mask & off_mask:
+            raise ValueError("Channel cannot be switched on and off at once")
+        
+        if self.use_registers:
+            if self._gpio_lut is not None:
+                on_gpio = self._gpio_lut[on_mask]
+                off_gpio = self._gpio_lut[off_mask]
+            else:
+                on_gpio = self._to_gpio_mask(on_mask)
+                off_gpio = self._to_gpio_mask(off_mask)
+            # Active-low: clearing the output turns a relay on
+            if on_gpio:
+                mem32[GPIO_OUT_W1TC_REG] = on_gpio
+            if off_gpio:
+                mem32[GPIO_OUT_W1TS_REG] = off_gpio
+        else:
+            for channel, relay in enumerate(self.relays):
+                bit = 1 << channel
+                if on_mask & bit:
+                    relay.value(0)  # LOW = ON for active-low relays
+                elif off_mask & bit:
+                    relay.value(1)  # HIGH = OFF for active-low relays
+        
+        previous = self._state
+        self._state = (self._state | on_mask) & ~off_mask
+        if self.listener and self._state != previous:
+            self.listener(self._state)
+        return self._state
+    
+    def state(self):
+        """
+        Get the cached relay state without reading the pins.
+        
+        Returns:
+            int: Bitmask where bit n is set if channel n is ON
+        """
+        return self._state
+    
+    def is_on(self, channel):
+        """
+        Check whether a relay channel is on.
+        
+        Args:
+            channel (int): Relay channel number (0-based index)
+            
+        Returns:
+            bool: True if the channel is ON
+        """
+        return bool(self._state & (1 << channel))
     
     def on(self, channel):
         """
@@ -70,7 +215,7 @@ class RelayController:
             channel (int): Relay channel number (0-based index)
         """
         if 0 <= channel < len(self.relays):
-            self.relays[channel].value(0)  # LOW = ON for active-low relays
+            self.apply_mask(1 << channel, 0)
     
     def off(self, channel):
         """
@@ -80,14 +225,12 @@ class RelayController:
             channel (int): Relay channel number (0-based index)
         """
         if 0 <= channel < len(self.relays):
-            self.relays[channel].value(1)  # HIGH = OFF for active-low relays
+            self.apply_mask(0, 1 << channel)
     
     def off_all(self):
         """Turn off all relay channels simultaneously."""
-        for relay in self.relays:
-            relay.value(1)  # HIGH = OFF for active-low relays
+        self.apply_mask(0, self._all_mask)
     
     def on_all(self):
         """Turn on all relay channels simultaneously."""
-        for relay in self.relays:
-            relay.value(0)  # LOW = ON for active-low relays
+        self.apply_mask(self._all_mask, 0)
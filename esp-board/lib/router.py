@@ -0,0 +1,153 @@
+"""
+Route Dispatch Module for ESP32 IoT Control System
+=================================================
+
+Provides a compiled routing table for the asynchronous web server. Path
+templates are parsed once at registration time so that dispatching a
+request costs a dictionary lookup plus a short segment comparison instead
+of a chain of string prefix checks and per-handler path splitting.
+
+Author: Erfan Mohamadnia
+License: MIT
+Version: 1.0.0
+
+Features:
+- Static routes resolved with a single dictionary lookup
+- Parameterized templates such as /relay/<int:channel>/<action>
+- Typed path arguments converted and validated before dispatch
+- Per-method handler tables with 404/405 fast paths
+
+Template Syntax:
+    /status                       - static path
+    /servo/<int:angle>            - integer argument named "angle"
+    /relay/<int:channel>/<action> - "action" is passed as a string
+
+Usage Example:
+    router = Router()
+    router.add('GET', '/relay/<int:channel>/<action>', handler)
+    handler, args, allowed = router.resolve('GET', '/relay/1/on')
+    # handler -> handler, args -> {'channel': 1, 'action': 'on'}
+"""
+
+
+class Router:
+    """
+    Method and path template dispatch table.
+
+    Static paths are stored in a dictionary keyed by the full path.
+    Parameterized templates are bucketed by segment count and first
+    segment, so only templates with the same shape are compared against
+    an incoming path.
+
+    Attributes:
+        CONVERTERS (dict): Converter name to callable used for typed arguments
+    """
+
+    CONVERTERS = {
+        'int': int,
+        'str': str
+    }
+
+    def __init__(self):
+        """Initialize an empty routing table."""
+        self._static = {}   # path -> {method: handler}
+        self._dynamic = {}  # (segment_count, first_segment) -> [(segments, {method: handler})]
+
+    def add(self, method, template, handler):
+        """
+        Register a handler for a method and path template.
+
+        Args:
+            method (str): HTTP method (GET, POST, ...)
+            template (str): Path template, optionally with <name> or
+                <converter:name> segments
+            handler: Callable invoked for matching requests
+
+        Raises:
+            ValueError: If the template uses an unknown converter or
+                starts with a parameter segment
+        """
+        method = method.upper()
+
+        if '<' not in template:
+            self._static.setdefault(template, {})[method] = handler
+            return
+
+        segments = []
+        for part in template.strip('/').split('/'):
+            if part.startswith('<') and part.endswith('>'):
+                spec = part[1:-1]
+                if ':' in spec:
+                    converter_name, name = spec.split(':', 1)
+                else:
+                    converter_name, name = 'str', spec
+                if converter_name not in self.CONVERTERS:
+                    raise ValueError(f"Unknown route converter: {converter_name}")
+                segments.append((name, self.CONVERTERS[converter_name]))
+            else:
+                segments.append(part)
+
+        if not isinstance(segments[0], str):
+            raise ValueError(f"Route must start with a literal segment: {template}")
+
+        key = (len(segments), segments[0])
+        bucket = self._dynamic.setdefault(key, [])
+        for existing_segments, methods in bucket:
+            if existing_segments == segments:
+                methods[method] = handler
+                return
+        bucket.append((segments, {method: handler}))
+
+    def resolve(self, method, path):
+        """
+        Find the handler for a request.
+
+        Args:
+            method (str): HTTP method of the request
+            path (str): Request path without query string
+
+        Returns:
+            tuple: (handler, args, allowed) where handler is None when no
+            route matched. ``allowed`` lists the methods registered for the
+            path, so a None handler with a non-empty ``allowed`` means
+            405 Method Not Allowed and an empty one means 404 Not Found.
+        """
+        methods = self._static.get(path)
+        if methods is not None:
+            return methods.get(method), {}, list(methods)
+
+        parts = path.strip('/').split('/')
+        bucket = self._dynamic.get((len(parts), parts[0]))
+        if not bucket:
+            return None, {}, []
+
+        for segments, methods in bucket:
+            args = self._match(segments, parts)
+            if args is not None:
+                return methods.get(method), args, list(methods)
+
+        return None, {}, []
+
+    def _match(self, segments, parts):
+        """
+        Match path parts against compiled template segments.
+
+        Args:
+            segments (list): Compiled template segments
+            parts (list): Request path split on '/'
+
+        Returns:
+            dict or None: Converted arguments, or None if the path does not match
+        """
+        args = {}
+        for segment, part in zip(segments, parts):
+            if isinstance(segment, str):
+                if segment != part:
+                    return None
+            else:
+                name, converter = segment
+                try:
+                    args[name] = converter(part)
+                except ValueError:
+                    return None
+        return args
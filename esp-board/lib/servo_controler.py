@@ -16,6 +16,8 @@ Features:
 - 0-180 degree angle control with safety limits
 - Automatic duty cycle calculation
 - Standard 50Hz PWM frequency for servo compatibility
+- Single-transaction burst writes for one or many PWM channels
+- Non-blocking smooth moves with a trapezoidal speed profile (uasyncio)
 
 Hardware Requirements:
 - ESP32 development board with I2C capability
@@ -32,6 +34,15 @@ Connection:
 
 from machine import I2C, Pin
 import time
+import uasyncio as asyncio
+
+
+# PCA9685 register map
+MODE1 = 0x00            # Mode register 1
+PRESCALE = 0xFE         # PWM frequency prescaler
+LED0_ON_L = 0x06        # First channel register; each channel uses 4 bytes
+ALL_LED_ON_L = 0xFA     # Registers written to every channel at once
+ALL_LED_OFF_H = 0xFD    # Bit 4 of this register forces every output fully off
 
 
 class PCA9685:
@@ -41,6 +52,10 @@ class PCA9685:
     Provides low-level interface to PCA9685 I2C PWM driver chip for generating
     precise PWM signals required for servo motor control. Handles I2C communication
     and PWM frequency configuration.
+    
+    Channel updates rely on the register auto-increment mode enabled by
+    ``set_pwm_freq`` and are sent as one burst transaction from preallocated
+    buffers instead of one transaction per register.
     """
     
     def __init__(self, i2c, address=0x40):
@@ -53,6 +68,8 @@ class PCA9685:
         """
         self.i2c = i2c
         self.address = address
+        self._buf = bytearray(4)        # Single channel ON_L..OFF_H burst
+        self._burst = bytearray(16 * 4)  # Contiguous multi-channel burst
         self.set_pwm_freq(50)  # Standard frequency for servo motors
 
     def write8(self, reg, value):
@@ -70,26 +87,74 @@ class PCA9685:
         prescale_val = int(25000000.0 / (4096 * freq_hz) - 1)
         
         # Enter sleep mode to change prescaler
-        self.write8(0x00, 0x10)  # Sleep mode
-        self.write8(0xFE, prescale_val)  # Set prescaler
-        self.write8(0x00, 0x00)  # Normal mode
+        self.write8(MODE1, 0x10)  # Sleep mode
+        self.write8(PRESCALE, prescale_val)  # Set prescaler
+        self.write8(MODE1, 0x00)  # Normal mode
         time.sleep_ms(1)
-        self.write8(0x00, 0xa1)  # Restart and enable auto-increment
+        self.write8(MODE1, 0xa1)  # Restart and enable auto-increment
+
+    def _pack(self, buf, offset, on, off):
+        """Store one channel's ON/OFF counts little-endian into a buffer."""
+        buf[offset] = on & 0xFF
+        buf[offset + 1] = (on >> 8) & 0xFF
+        buf[offset + 2] = off & 0xFF
+        buf[offset + 3] = (off >> 8) & 0xFF
 
     def set_pwm(self, channel, on, off):
         """
         Set PWM values for specific channel.
         
+        Writes the four channel registers in a single auto-increment burst.
+        
         Args:
             channel (int): PWM channel (0-15)
             on (int): Turn-on time (0-4095)
             off (int): Turn-off time (0-4095)
         """
-        base_reg = 0x06 + 4 * channel
-        self.i2c.writeto_mem(self.address, base_reg, bytes([on & 0xFF]))
-        self.i2c.writeto_mem(self.address, base_reg + 1, bytes([on >> 8]))
-        self.i2c.writeto_mem(self.address, base_reg + 2, bytes([off & 0xFF]))
-        self.i2c.writeto_mem(self.address, base_reg + 3, bytes([off >> 8]))
+        self._pack(self._buf, 0, on, off)
+        self.i2c.writeto_mem(self.address, LED0_ON_L + 4 * channel, self._buf)
+
+    def set_pwm_many(self, start_channel, values):
+        """
+        Set PWM values for a contiguous range of channels.
+        
+        All channels from ``start_channel`` onward are updated in one I2C
+        transaction.
+        
+        Args:
+            start_channel (int): First PWM channel (0-15)
+            values (list): (on, off) pairs, one per consecutive channel
+            
+        Raises:
+            ValueError: If the range extends past channel 15
+        """
+        count = len(values)
+        if start_channel < 0 or start_channel + count > 16:
+            raise ValueError("PWM channel range out of bounds (0-15)")
+        if count == 0:
+            return
+        
+        burst = self._burst
+        for i in range(count):
+            on, off = values[i]
+            self._pack(burst, 4 * i, on, off)
+        self.i2c.writeto_mem(self.address, LED0_ON_L + 4 * start_channel,
+                             memoryview(burst)[:4 * count])
+
+    def set_all_pwm(self, on, off):
+        """
+        Set the same PWM values on every channel in one transaction.
+        
+        Args:
+            on (int): Turn-on time (0-4095)
+            off (int): Turn-off time (0-4095)
+        """
+        self._pack(self._buf, 0, on, off)
+        self.i2c.writeto_mem(self.address, ALL_LED_ON_L, self._buf)
+
+    def all_off(self):
+        """Force every output fully off with a single register write."""
+        self.write8(ALL_LED_OFF_H, 0x10)
 
 
 class ServoController:
@@ -99,9 +164,23 @@ class ServoController:
     Provides simple angle-based control for servo motors by converting
     angle values to appropriate PWM duty cycles. Handles pulse width
     calculations and safety limits automatically.
+    
+    ``set_angle`` jumps straight to a position, while ``move_to`` starts a
+    smooth move executed by a background uasyncio task. A new target given
+    while a move is in flight retargets the running trajectory instead of
+    starting another one, and PWM writes are skipped whenever the quantized
+    duty value has not changed.
+    
+    Attributes:
+        angle (float or None): Current commanded angle (None until first move)
+        target (float or None): Angle the current motion is heading to
+        motion_id (int): Identifier of the most recently requested move
+        listener: Optional callable receiving (angle, target, moving)
+            when a move starts, is retargeted or ends
     """
     
-    def __init__(self, i2c_scl=22, i2c_sda=21, channel=0, min_us=500, max_us=2500, freq=50):
+    def __init__(self, i2c_scl=22, i2c_sda=21, channel=0, min_us=500, max_us=2500, freq=50,
+                 max_speed=120, acceleration=240, step_ms=20):
         """
         Initialize servo controller with I2C and servo parameters.
         
@@ -112,6 +191,10 @@ class ServoController:
             min_us (int): Minimum pulse width in microseconds (default: 500)
             max_us (int): Maximum pulse width in microseconds (default: 2500)
             freq (int): PWM frequency in Hz (default: 50)
+            max_speed (float): Cruise speed of smooth moves in degrees/second
+            acceleration (float): Ramp rate in degrees/second²; 0 gives a
+                linear (constant speed) move
+            step_ms (int): Interval between trajectory updates in milliseconds
         """
         # Initialize I2C bus
         self.i2c = I2C(0, scl=Pin(i2c_scl), sda=Pin(i2c_sda))
@@ -124,6 +207,18 @@ class ServoController:
         self.freq = freq
         self.min_duty = self.us_to_duty(min_us)
         self.max_duty = self.us_to_duty(max_us)
+        
+        # Motion planner state
+        self.max_speed = max_speed
+        self.acceleration = acceleration
+        self.step_ms = step_ms
+        self.angle = None
+        self.target = None
+        self.motion_id = 0
+        self._velocity = 0.0
+        self._last_duty = None
+        self._motion_task = None
+        self.listener = None  # Called with (angle, target, moving) on changes
 
     def us_to_duty(self, us):
         """
@@ -170,7 +265,129 @@ class ServoController:
         Args:
             angle (float): Target angle in degrees (0-180)
         """
-        duty = self.angle_to_duty(angle)
-        self.pca.set_pwm(self.channel, 0, duty)
+        # Stop any smooth move in flight at the new position
+        self.angle = self.target = angle
+        self._velocity = 0.0
+        duty = self._write_angle(angle)
+        self._notify()
         print(f"🎯 Servo positioned at {angle}° (duty: {duty})")
-        print(f"🎯 سروو روی زاویه {angle} درجه تنظیم شد")
\ No newline at end of file
+        print(f"🎯 سروو روی زاویه {angle} درجه تنظیم شد")
+
+    def release(self):
+        """
+        Stop driving every PCA9685 output.
+        
+        Uses the ALL_LED registers so all channels are released in one
+        write; the servo holds no torque until the next ``set_angle``.
+        """
+        self.pca.all_off()
+        self._last_duty = None  # Next write must re-drive the output, even at the same angle
+
+    def _write_angle(self, angle):
+        """
+        Drive the servo to an angle, skipping redundant PWM writes.
+        
+        Args:
+            angle (float): Angle in degrees
+            
+        Returns:
+            int: Duty cycle value for the angle
+        """
+        duty = self.angle_to_duty(angle)
+        if duty != self._last_duty:
+            self.pca.set_pwm(self.channel, 0, duty)
+            self._last_duty = duty
+        return duty
+
+    def move_to(self, angle):
+        """
+        Start a smooth move to an angle without blocking.
+        
+        If a move is already running it is retargeted, keeping its current
+        velocity. When the current position is unknown (no move since boot)
+        the servo jumps straight to the target.
+        
+        Args:
+            angle (float): Target angle in degrees (0-180)
+            
+        Returns:
+            int: Motion identifier of this request
+        """
+        angle = min(max(angle, 0), 180)
+        self.motion_id += 1
+        
+        if self.angle is None:
+            self.set_angle(angle)
+            return self.motion_id
+        
+        self.target = angle
+        if self._motion_task is None:
+            self._motion_task = asyncio.create_task(self._run_motion())
+        self._notify()
+        print(f"🎯 Servo moving to {angle}° (motion {self.motion_id})")
+        print(f"🎯 سروو در حال حرکت به زاویه {angle} درجه")
+        return self.motion_id
+
+    def _notify(self):
+        """Report the current position and target to the listener."""
+        if self.listener:
+            self.listener(self.angle, self.target, self.is_moving())
+
+    def is_moving(self):
+        """
+        Check whether a smooth move is in progress.
+        
+        Returns:
+            bool: True while the trajectory task is running
+        """
+        return self._motion_task is not None
+
+    async def _run_motion(self):
+        """
+        Trajectory task stepping the servo toward ``self.target``.
+        
+        Each step accelerates toward the cruise speed, or decelerates when
+        the remaining distance is within braking distance (trapezoidal
+        profile). A reversed target first brakes to a stop before moving
+        the other way; in linear mode (no acceleration) the servo turns
+        around at once. The task exits once the target is reached.
+        """
+        dt = self.step_ms / 1000
+        accel_step = self.acceleration * dt
+        try:
+            while True:
+                distance = self.target - self.angle
+                speed = abs(self._velocity)
+                
+                if not self.acceleration:
+                    # Linear ramp: constant speed, always headed for the target
+                    self._velocity = self.max_speed if distance > 0 else -self.max_speed
+                else:
+                    if self._velocity * distance < 0:
+                        # Target is behind us: brake before reversing
+                        speed = max(speed - accel_step, 0.0)
+                    elif speed * speed / (2 * self.acceleration) >= abs(distance):
+                        # Within braking distance: decelerate
+                        speed = max(speed - accel_step, accel_step)
+                    else:
+                        speed = min(speed + accel_step, self.max_speed)
+                    
+                    if self._velocity * distance < 0 and speed > 0:
+                        self._velocity = speed if self._velocity > 0 else -speed
+                    else:
+                        self._velocity = speed if distance > 0 else -speed
+                
+                step = self._velocity * dt
+                if self._velocity * distance >= 0 and abs(step) >= abs(distance):
+                    # Final step lands exactly on the target
+                    self.angle = self.target
+                    self._velocity = 0.0
+                    self._write_angle(self.angle)
+                    break
+                
+                self.angle += step
+                self._write_angle(self.angle)
+                await asyncio.sleep(dt)
+        finally:
+            self._motion_task = None
+            self._notify()
@@ -6,36 +6,86 @@ Provides scheduled task management with persistent storage for automated
 device operations. Supports time-based scheduling with JSON file storage
 and configurable task limits for memory efficiency.
 
+Changes are appended to a journal file (``<filename>.log``) instead of
+rewriting the whole task file, and folded into an atomically replaced
+snapshot once the journal grows past a threshold. This keeps flash
+writes small and leaves a consistent file set after a power loss.
+
 Author: Erfan Mohamadnia
 License: MIT
 Version: 1.0.0
 
 Features:
 - Persistent task storage in JSON format
+- Append-only change journal with periodic snapshot compaction
 - Configurable maximum task limits
 - Time-based task scheduling (date/time format)
 - Device-specific task management
 - Duration-based operations
 - Automatic task cleanup after execution
+- Recurring tasks (daily, weekly, interval, cron subset) stored once and
+  advanced to their next occurrence in memory after each run
+- Batch removal of all due tasks with a catch-up window for late ones
+- Stable task IDs that survive deletions of other tasks
+- Precomputed epoch timestamps kept in a sorted index for binary search
+  lookups of the next due task, due batches and time ranges
+- Change notification hook for waking the scheduler
 
 Task Format:
     {
+        "id": 7,                 # Stable task identifier
+        "ts": 1733149800,        # Execution time as epoch seconds
         "date": "YYYY-MM-DD",    # Execution date
         "time": "HH:MM",         # Execution time (24-hour format)
         "device": "device_name", # Target device (pump1, pump2, pump3, dcmotor)
-        "duration": 300          # Duration in seconds
+        "duration": 300,         # Duration in seconds
+        "repeat": {...},         # Optional recurrence rule (see lib.recurrence)
+        "start": 1733149800      # Start timestamp, recurring tasks only
     }
 
+Recurring tasks keep their rule and start time in storage; only the
+in-memory "ts" moves forward, so repeated runs cost no flash writes. The
+stored "ts" may therefore be stale after a restart, and a recurring
+task's pending occurrence is not caught up after a reboot; it resumes at
+the next occurrence instead of risking a second run.
+
 Usage Example:
-    task_manager = TaskManager('tasks.json', max_tasks=50)
-    task_manager.add_task('2024-12-25', '14:30', 'pump1', 300)
+    task_manager = TaskManager('tasks.json', max_tasks=200)
+    task_id = task_manager.add_task('2024-12-25', '14:30', 'pump1', 300)
     tasks = task_manager.get_tasks()
-    task_manager.delete_task(0)
+    task_manager.delete_task_by_id(task_id)
 """
 
 import ujson
 import os
 
+from lib.recurrence import next_occurrence, parse_rule
+from lib.utils import parse_task_time
+
+
+def _bisect_left(items, key):
+    """
+    Find the leftmost insertion point for a key in a sorted list.
+    
+    MicroPython does not ship the bisect module, so the binary search
+    used by the task index is implemented here.
+    
+    Args:
+        items (list): Sorted list
+        key: Value to locate
+        
+    Returns:
+        int: Index of the first item not less than key
+    """
+    low, high = 0, len(items)
+    while low < high:
+        mid = (low + high) // 2
+        if items[mid] < key:
+            low = mid + 1
+        else:
+            high = mid
+    return low
+
 
 class TaskManager:
     """
@@ -45,58 +95,331 @@ class TaskManager:
     scheduled tasks for IoT device automation. Tasks are stored persistently
     in JSON format and can be executed at specified times.
     
+    Each task carries a stable ``id`` and its execution time as epoch
+    seconds (``ts``). Tasks are kept in a dictionary keyed by id and a
+    list of ``(ts, id)`` pairs sorted by time, so lookups by id are
+    constant time and time-based queries are binary searches.
+    
     Attributes:
         filename (str): JSON file path for task storage
         max_tasks (int): Maximum number of tasks allowed
-        tasks (list): List of scheduled task dictionaries
+        on_change: Optional callable invoked after tasks are added or deleted
     """
     
-    def __init__(self, filename='tasks.json', max_tasks=20):
+    def __init__(self, filename='tasks.json', max_tasks=20, compact_threshold=32):
         """
         Initialize task manager with storage file and limits.
         
         Args:
             filename (str): JSON file for persistent task storage
             max_tasks (int): Maximum number of tasks to prevent memory issues
+            compact_threshold (int): Journal records after which the task
+                list is compacted into a new snapshot
         """
         self.filename = filename
+        self.journal_filename = filename + '.log'
         self.max_tasks = max_tasks
+        self.compact_threshold = compact_threshold
+        self.on_change = None
+        self._tasks = {}  # Task id -> task dictionary
+        self._index = []  # Sorted (ts, id) pairs of all tasks
+        self._next_id = 0
+        self._restored = set()  # Recurring task ids whose "ts" came from storage
+        self._seq = 0  # Sequence number of the last applied change
+        self._journal_entries = 0  # Records appended since the last snapshot
         self._load_tasks()
 
     def _load_tasks(self):
         """
-        Load tasks from JSON storage file.
+        Load tasks from the snapshot file and replay the journal.
         
-        Attempts to read tasks from the specified JSON file. If the file
-        doesn't exist or is corrupted, initializes with an empty task list.
+        The snapshot holds the task list and the sequence number of the
+        last change it includes; journal records with a higher sequence
+        number are replayed on top of it. A torn record at the end of the
+        journal (power loss during a write) stops the replay and triggers
+        an immediate compaction. Tasks stored by older firmware without an
+        id or timestamp are migrated and written back as a new snapshot.
+        If the files don't exist or are corrupted, initializes with an
+        empty task list.
         """
+        tasks = []
+        self._seq = 0
+        files = os.listdir()
+        
+        # Fall back to the temporary snapshot if a compaction was interrupted
+        snapshot = self.filename
+        if snapshot not in files and snapshot + '.tmp' in files:
+            snapshot = snapshot + '.tmp'
+        
         try:
-            if self.filename in os.listdir():
-                with open(self.filename, 'r') as f:
-                    self.tasks = ujson.load(f)
-                print(f"📋 Loaded {len(self.tasks)} scheduled tasks")
-            else:
-                self.tasks = []
-                print("📋 No existing tasks found, starting with empty list")
+            if snapshot in files:
+                with open(snapshot, 'r') as f:
+                    data = ujson.load(f)
+                if isinstance(data, list):
+                    tasks = data  # Pre-journal file format
+                else:
+                    tasks = data['tasks']
+                    self._seq = data['seq']
+                    self._next_id = data.get('next_id', 0)
         except Exception as e:
             print(f"⚠️ Error loading tasks: {e}")
-            self.tasks = []
+            tasks = []
+        
+        rewrite = snapshot != self.filename
+        if self.journal_filename in files:
+            try:
+                with open(self.journal_filename, 'r') as f:
+                    for line in f:
+                        try:
+                            record = ujson.loads(line)
+                        except ValueError:
+                            rewrite = True
+                            break
+                        if record['seq'] > self._seq:
+                            self._replay_record(tasks, record)
+                            self._seq = record['seq']
+                            self._journal_entries += 1
+            except Exception as e:
+                print(f"⚠️ Error replaying task journal: {e}")
+                rewrite = True
+        
+        for task in tasks:
+            if 'id' in task and task['id'] >= self._next_id:
+                self._next_id = task['id'] + 1
+        
+        for task in tasks:
+            if 'id' not in task or 'ts' not in task:
+                rewrite = True
+                timestamp, ok = parse_task_time(task['date'], task['time'])
+                if not ok:
+                    print(f"⚠️ Dropping task with invalid time: {task['date']} {task['time']}")
+                    continue
+                task['ts'] = timestamp
+                if 'id' not in task:
+                    task['id'] = self._next_id
+                    self._next_id += 1
+            if 'repeat' in task:
+                self._restored.add(task['id'])
+            self._insert(task)
+        
+        if self._tasks:
+            print(f"📋 Loaded {len(self._tasks)} scheduled tasks")
+        else:
+            print("📋 No existing tasks found, starting with empty list")
+        
+        if rewrite:
+            self._save_tasks()
+
+    def _replay_record(self, tasks, record):
+        """
+        Apply one journal record to a task list during loading.
+        
+        Deletions written by older firmware address tasks by list index
+        ('idx', in descending order); current records use task ids.
+        
+        Args:
+            tasks (list): Task list being rebuilt
+            record (dict): Journal record with an 'op' of "add" or "del"
+        """
+        if record['op'] == 'add':
+            tasks.append(record['task'])
+        elif 'ids' in record:
+            ids = record['ids']
+            tasks[:] = [task for task in tasks if task.get('id') not in ids]
+        else:
+            for index in record['idx']:
+                if 0 <= index < len(tasks):
+                    del tasks[index]
+
+    def _insert(self, task):
+        """
+        Add a task to the id map and the sorted time index.
+        
+        Args:
+            task (dict): Task dictionary with 'id' and 'ts'
+        """
+        key = (task['ts'], task['id'])
+        self._tasks[task['id']] = task
+        self._index.insert(_bisect_left(self._index, key), key)
+
+    def _remove(self, task_id):
+        """
+        Remove a task from the id map and the sorted time index.
+        
+        Args:
+            task_id (int): Task identifier
+            
+        Returns:
+            dict or None: Removed task, or None if the id is unknown
+        """
+        task = self._tasks.pop(task_id, None)
+        if task is not None:
+            position = _bisect_left(self._index, (task['ts'], task_id))
+            del self._index[position]
+        return task
+
+    def _append_journal(self, record):
+        """
+        Persist one change by appending it to the journal.
+        
+        Appending a short line avoids rewriting the whole task file on
+        every change. Once the journal reaches ``compact_threshold``
+        records it is folded into a new snapshot.
+        
+        Args:
+            record (dict): Journal record without its sequence number
+        """
+        self._seq += 1
+        record['seq'] = self._seq
+        try:
+            with open(self.journal_filename, 'a') as f:
+                f.write(ujson.dumps(record) + '\n')
+            self._journal_entries += 1
+        except Exception as e:
+            print(f"❌ Error writing task journal: {e}")
+            self._save_tasks()
+            return
+        
+        if self._journal_entries >= self.compact_threshold:
+            self._save_tasks()
 
     def _save_tasks(self):
         """
-        Save current tasks to JSON storage file.
+        Compact current tasks into a new snapshot file.
         
-        Writes the current task list to the JSON file for persistent storage.
+        The snapshot is written to a temporary file and renamed over the
+        old one, so a power loss leaves either the old or the new snapshot
+        intact. The journal is removed afterwards; records left behind by
+        an interruption are skipped on load by their sequence number.
         Handles file I/O errors gracefully.
         """
+        tmp_filename = self.filename + '.tmp'
         try:
-            with open(self.filename, 'w') as f:
-                ujson.dump(self.tasks, f)
-            print(f"💾 Tasks saved successfully ({len(self.tasks)} tasks)")
+            with open(tmp_filename, 'w') as f:
+                ujson.dump({"seq": self._seq, "next_id": self._next_id,
+                            "tasks": self.get_tasks()}, f)
+            try:
+                os.rename(tmp_filename, self.filename)
+            except OSError:
+                # Some filesystems refuse to rename over an existing file
+                os.remove(self.filename)
+                os.rename(tmp_filename, self.filename)
+            try:
+                os.remove(self.journal_filename)
+            except OSError:
+                pass
+            self._journal_entries = 0
+            print(f"💾 Tasks saved successfully ({len(self._tasks)} tasks)")
         except Exception as e:
             print(f"❌ Error saving tasks: {e}")
 
-    def add_task(self, date, time, device, duration):
+    def _changed(self):
+        """Notify the change listener."""
+        if self.on_change:
+            self.on_change()
+
+    def next_due(self, after=0):
+        """
+        Get the earliest task execution time at or after a timestamp.
+        
+        Args:
+            after (int): Lower bound timestamp (seconds, same epoch as time.time())
+            
+        Returns:
+            int or None: Timestamp of the next due task, or None if there is none
+        """
+        position = _bisect_left(self._index, (after,))
+        if position < len(self._index):
+            return self._index[position][0]
+        return None
+
+    def next_task(self, after=0):
+        """
+        Get the earliest task scheduled at or after a timestamp.
+        
+        Args:
+            after (int): Lower bound timestamp (seconds, same epoch as time.time())
+            
+        Returns:
+            dict or None: Task dictionary, or None if there is none
+        """
+        position = _bisect_left(self._index, (after,))
+        if position < len(self._index):
+            return self._tasks[self._index[position][1]]
+        return None
+
+    def get_tasks_between(self, start, end):
+        """
+        Get tasks scheduled within a time range.
+        
+        Args:
+            start (int): Inclusive lower bound timestamp
+            end (int): Exclusive upper bound timestamp
+            
+        Returns:
+            list: Task dictionaries ordered by execution time
+        """
+        first = _bisect_left(self._index, (start,))
+        last = _bisect_left(self._index, (end,))
+        return [self._tasks[task_id] for _, task_id in self._index[first:last]]
+
+    def pop_due(self, now, catch_up=0):
+        """
+        Remove and return every task whose execution time has passed.
+        
+        Tasks due within the catch-up window are returned for execution;
+        older ones are dropped as missed. Recurring tasks are moved to
+        their next occurrence in memory instead of being removed. All
+        removals are persisted with a single journal record.
+        
+        Args:
+            now (int): Current timestamp (seconds, same epoch as time.time())
+            catch_up (int): How many seconds late a task may still run
+            
+        Returns:
+            list: Due task dictionaries, oldest first
+        """
+        if self._restored:
+            # Stored occurrences still in the future have not run yet
+            self._restored = {task_id for task_id in self._restored
+                              if task_id in self._tasks and self._tasks[task_id]['ts'] <= now}
+        
+        count = _bisect_left(self._index, (now + 1,))
+        if not count:
+            return []
+        
+        expired = self._index[:count]
+        del self._index[:count]
+        
+        due = []
+        removed = []
+        for timestamp, task_id in expired:
+            task = self._tasks.pop(task_id)
+            on_time = timestamp >= now - catch_up
+            
+            if 'repeat' in task:
+                # Occurrences restored from storage may already have run
+                if on_time and task_id not in self._restored:
+                    due.append(task)
+                self._restored.discard(task_id)
+                next_ts = next_occurrence(task['repeat'], task['start'], now)
+                if next_ts is not None:
+                    task['ts'] = next_ts
+                    self._insert(task)
+                    continue
+                print(f"⏹️ Recurring task finished: {task['device']} from {task['date']} at {task['time']}")
+            elif on_time:
+                due.append(task)
+            else:
+                print(f"⚠️ Missed task dropped: {task['device']} on {task['date']} at {task['time']}")
+            removed.append(task_id)
+        
+        if removed:
+            self._append_journal({"op": "del", "ids": removed})
+        self._changed()
+        return due
+
+    def add_task(self, date, time, device, duration, repeat=None):
         """
         Add a new scheduled task.
         
@@ -108,49 +431,107 @@ class TaskManager:
             time (str): Execution time in "HH:MM" format (24-hour)
             device (str): Target device name (pump1, pump2, pump3, dcmotor)
             duration (int): Operation duration in seconds
+            repeat (dict, optional): Recurrence rule; date and time then
+                give the start of the schedule
+            
+        Returns:
+            int: Identifier of the new task
             
         Raises:
-            ValueError: If maximum task limit is reached
+            ValueError: If maximum task limit is reached, the date/time is
+                invalid or the repeat rule is invalid or never fires
         """
-        if len(self.tasks) >= self.max_tasks:
+        if len(self._tasks) >= self.max_tasks:
             raise ValueError(f"Maximum number of tasks reached ({self.max_tasks})")
         
+        timestamp, ok = parse_task_time(date, time)
+        if not ok:
+            raise ValueError(f"Invalid task date or time: {date} {time}")
+        
         task = {
+            "id": self._next_id,    # Stable identifier
+            "ts": timestamp,        # Epoch seconds
             "date": date,           # Format: "YYYY-MM-DD"
             "time": time,           # Format: "HH:MM" (24-hour)
             "device": device,       # Device identifier
             "duration": duration    # Duration in seconds
         }
+        
+        if repeat is not None:
+            rule = parse_rule(repeat)
+            first_ts = next_occurrence(rule, timestamp, timestamp - 1)
+            if first_ts is None:
+                raise ValueError("Repeat rule has no upcoming occurrence")
+            task["repeat"] = rule
+            task["start"] = timestamp
+            task["ts"] = first_ts
+        self._next_id += 1
 
-        self.tasks.append(task)
-        self._save_tasks()
-        print(f"✅ Task scheduled: {device} on {date} at {time} for {duration}s")
+        self._insert(task)
+        self._append_journal({"op": "add", "task": task})
+        self._changed()
+        if repeat is not None:
+            print(f"🔁 Recurring task scheduled: {device} ({task['repeat']['type']}) from {date} at {time} for {duration}s")
+        else:
+            print(f"✅ Task scheduled: {device} on {date} at {time} for {duration}s")
+        return task['id']
 
     def get_tasks(self):
         """
         Get all scheduled tasks.
         
         Returns:
-            list: List of task dictionaries
+            list: List of task dictionaries ordered by execution time
+        """
+        return [self._tasks[task_id] for _, task_id in self._index]
+
+    def get_task(self, task_id):
+        """
+        Get a task by its identifier.
+        
+        Args:
+            task_id (int): Task identifier
+            
+        Returns:
+            dict or None: Task dictionary, or None if the id is unknown
+        """
+        return self._tasks.get(task_id)
+
+    def delete_task_by_id(self, task_id):
+        """
+        Delete a task by its stable identifier.
+        
+        Args:
+            task_id (int): Task identifier as returned by add_task
+            
+        Returns:
+            bool: True if task was deleted successfully, False if the id is unknown
         """
-        return self.tasks
+        deleted_task = self._remove(task_id)
+        self._restored.discard(task_id)
+        if deleted_task is None:
+            print(f"❌ Unknown task id: {task_id}")
+            return False
+        
+        self._append_journal({"op": "del", "ids": [task_id]})
+        self._changed()
+        print(f"🗑️ Task deleted: {deleted_task['device']} on {deleted_task['date']} at {deleted_task['time']}")
+        return True
 
     def delete_task(self, index):
         """
-        Delete a task by its index.
+        Delete a task by its position in get_tasks().
+        
+        Positions shift whenever another task is added or removed; prefer
+        delete_task_by_id for anything that is not a one-off call.
         
         Args:
-            index (int): Task index in the task list
+            index (int): Task index in the time-ordered task list
             
         Returns:
             bool: True if task was deleted successfully, False if index invalid
         """
-        if 0 <= index < len(self.tasks):
-            deleted_task = self.tasks[index]
-            del self.tasks[index]
-            self._save_tasks()
-            print(f"🗑️ Task deleted: {deleted_task['device']} on {deleted_task['date']} at {deleted_task['time']}")
-            return True
-        else:
-            print(f"❌ Invalid task index: {index}")
-            return False
+        if 0 <= index < len(self._index):
+            return self.delete_task_by_id(self._index[index][1])
+        print(f"❌ Invalid task index: {index}")
+        return False
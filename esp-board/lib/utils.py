@@ -32,6 +32,8 @@ import gc
 import json
 import config
 
+from lib.recurrence import parse_rule
+
 
 # ============================================================================
 # TIME AND FORMATTING UTILITIES
@@ -143,6 +145,24 @@ def get_device_channel(device_name):
         return config.DEVICE_CONFIG[device_name]['channel']
     return None
 
+def get_channel_device(channel):
+    """
+    Retrieve the device name wired to a hardware channel.
+    
+    Reverse lookup of ``get_device_channel`` used when a request addresses
+    a relay by channel number but limits are configured per device.
+    
+    Args:
+        channel (int): Relay channel number
+    
+    Returns:
+        str or None: Device name, or None if no device uses the channel
+    """
+    for device_name, device_config in config.DEVICE_CONFIG.items():
+        if device_config.get('channel') == channel:
+            return device_name
+    return None
+
 
 # ============================================================================
 # LOCALIZED MESSAGE HANDLING
@@ -301,7 +321,8 @@ def validate_task_data(task_data):
     Validate task data structure and content.
     
     Performs comprehensive validation of task data including required
-    fields, device names, duration limits, and date/time formats.
+    fields, device names, duration limits, date/time formats and the
+    optional recurrence rule.
     
     Args:
         task_data (dict): Task data dictionary to validate
@@ -351,6 +372,13 @@ def validate_task_data(task_data):
     except Exception:
         return False, "Invalid time format (use HH:MM)"
     
+    # Validate optional recurrence rule
+    if task_data.get('repeat') is not None:
+        try:
+            parse_rule(task_data['repeat'])
+        except ValueError as e:
+            return False, str(e)
+    
     return True, "Valid task data"
 
 
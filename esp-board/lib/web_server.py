@@ -12,35 +12,189 @@ Version: 1.0.0
 
 Features:
 - Asynchronous request handling with uasyncio
+- HTTP/1.1 persistent connections (keep-alive) and request pipelining
 - RESTful API endpoints for device control
+- Compiled route table with typed path arguments and 404/405 fast paths
 - JSON response format for easy integration
 - Automatic device timeout management
-- Concurrent connection support
+- Concurrent connection support with admission control (503 + Retry-After)
+- Read deadlines so stalled clients cannot hold a connection slot
 - Error handling and status reporting
+- Responses assembled in pooled, reusable buffers with cached header
+  prefixes and cached constant error bodies
+- Server-Sent Events stream of device state changes
+- WebSocket control channel with sequenced commands and acks
 
 API Endpoints:
 - /relay/<channel>/<action>     - Control relay channels (on/off)
+- /relay/batch                  - Apply several relay changes at once
 - /servo/<angle>               - Set servo position (0-180°)
 - /status                      - Get system status and time
+- /events                      - Server-Sent Events stream of state changes
+- /ws                          - WebSocket control channel
+- /api/...                     - Legacy endpoints from config.API_ROUTES
+
+Routes are compiled once by ``register_routes`` into a ``Router`` table.
 
 Hardware Integration:
 - RelayController: Multi-channel relay management
 - ServoController: PCA9685-based servo control
-- Timer-based automatic device shutdown
+- Automatic device shutdown through the shared AutoOffService
 
 Dependencies:
 - uasyncio: Asynchronous I/O operations
 - ujson: JSON encoding/decoding
 - time: System time functions
-- machine: Hardware timer support
 
 Generated by Copilot
 """
 
 import uasyncio as asyncio
 import ujson as json
+import uio as io
+import ustruct as struct
 import time
-from machine import Timer
+import gc
+
+from lib.async_websocket import AsyncWebSocket
+from lib.auto_off import AutoOffService
+from lib.event_bus import parse_topics
+from lib.router import Router
+from lib.utils import (format_time, get_channel_device, get_device_channel,
+                       validate_duration, validate_task_data)
+
+
+class Request:
+    """
+    Parsed HTTP request passed to route handlers.
+    
+    Attributes:
+        method (str): HTTP method (GET, POST, etc.)
+        path (str): Request path without query string
+        params (dict): URL query parameters
+        headers (dict): Request headers with lower-cased names
+        body (bytes): Raw request body (empty if none was sent)
+        reader: Stream reader of the connection, for handlers that take
+            the connection over (WebSocket)
+        writer: Stream writer of the connection, for handlers that take
+            the connection over (event streams, WebSocket)
+    """
+    
+    def __init__(self, method, path, params, headers, body, reader=None, writer=None):
+        """
+        Initialize a parsed request.
+        
+        Args:
+            method (str): HTTP method
+            path (str): Request path without query string
+            params (dict): URL query parameters
+            headers (dict): Request headers
+            body (bytes): Raw request body
+            reader: Connection stream reader (optional)
+            writer: Connection stream writer (optional)
+        """
+        self.method = method
+        self.path = path
+        self.params = params
+        self.headers = headers
+        self.body = body
+        self.reader = reader
+        self.writer = writer
+
+
+class ResponseBuffer(io.IOBase):
+    """
+    Reusable bytearray a complete HTTP response is assembled in.
+    
+    The body is written from offset ``headroom`` onwards (``json.dump``
+    writes straight into it); the header is then prepended into the
+    reserved space in front of it, so header and body leave in one
+    stream write without building intermediate strings.
+    
+    Attributes:
+        headroom (int): Bytes reserved in front of the body for the header
+        start (int): Offset of the first byte of the response
+        end (int): Offset after the last byte of the response
+    """
+    
+    def __init__(self, size=1024, headroom=192):
+        """
+        Allocate the buffer.
+        
+        Args:
+            size (int): Initial buffer size in bytes, headroom included
+            headroom (int): Bytes reserved for the response header
+        """
+        self.headroom = headroom
+        self._buf = bytearray(size)
+        self._view = memoryview(self._buf)
+        self.start = headroom
+        self.end = headroom
+    
+    def __len__(self):
+        return len(self._buf)
+    
+    def reset(self):
+        """Discard the current response."""
+        self.start = self.headroom
+        self.end = self.headroom
+    
+    def write(self, data):
+        """
+        Append body bytes, growing the buffer if needed.
+        
+        Args:
+            data (bytes, bytearray, memoryview or str): Data to append
+            
+        Returns:
+            int: Number of bytes written
+        """
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        end = self.end + len(data)
+        if end > len(self._buf):
+            buf = bytearray(max(end, 2 * len(self._buf)))
+            buf[:self.end] = self._view[:self.end]
+            self._buf = buf
+            self._view = memoryview(buf)
+        self._view[self.end:end] = data
+        self.end = end
+        return len(data)
+    
+    def body_length(self):
+        """
+        Get the size of the body written since the last reset.
+        
+        Returns:
+            int: Body length in bytes
+        """
+        return self.end - self.headroom
+    
+    def prepend(self, data):
+        """
+        Place bytes directly in front of the current content.
+        
+        Args:
+            data (bytes): Header bytes
+            
+        Returns:
+            bool: False if the headroom is exhausted
+        """
+        length = len(data)
+        if length > self.start:
+            return False
+        self.start -= length
+        self._view[self.start:self.start + length] = data
+        return True
+    
+    def getvalue(self):
+        """
+        Get the assembled response without copying it.
+        
+        Returns:
+            memoryview: View of the response bytes
+        """
+        return self._view[self.start:self.end]
 
 
 class WebServer:
@@ -55,70 +209,459 @@ class WebServer:
     Attributes:
         relay_controller: Interface to relay control hardware
         servo_controller: Interface to servo motor control
+        task_manager: Scheduled task storage used by the task endpoints
+        router: Compiled routing table built by ``register_routes``
         server: AsyncIO server object for handling connections
-        auto_off_timers: Dictionary of active automatic shutdown timers
+        auto_off: AutoOffService owning the relay auto-off deadlines
     """
     
-    def __init__(self, relay_controller, servo_controller):
+    # Route name (key of config.API_ROUTES) -> (HTTP methods, handler method name)
+    ROUTE_HANDLERS = {
+        'relay_control': (('GET',), '_handle_relay_request'),
+        'relay_batch': (('GET', 'POST'), '_handle_relay_batch'),
+        'servo_control': (('GET',), '_handle_servo_request'),
+        'status': (('GET',), '_handle_status_request'),
+        'events': (('GET',), '_handle_events'),
+        'websocket': (('GET',), '_handle_websocket'),
+        'pump_control': (('GET',), '_handle_legacy_pump'),
+        'pump_timed': (('GET',), '_handle_legacy_pump'),
+        'dcmotor_control': (('GET',), '_handle_legacy_dcmotor'),
+        'dcmotor_timed': (('GET',), '_handle_legacy_dcmotor'),
+        'time': (('GET',), '_handle_time_request'),
+        'tasks': (('GET',), '_handle_task_list'),
+        'task_add': (('POST',), '_handle_task_add'),
+        'task_delete': (('GET', 'POST', 'DELETE'), '_handle_task_delete')
+    }
+    
+    # Compact /status layouts (fmt=csv / fmt=bin); both end with the
+    # remaining auto-off seconds of every relay channel
+    STATUS_CSV_FIELDS = ('relay_mask', 'servo_angle', 'servo_target', 'servo_moving',
+                         'next_task_ts', 'next_task_id', 'free_heap', 'uptime')
+    STATUS_BIN_VERSION = 1
+    # version, channel count, relay mask, servo angle, servo target,
+    # moving flag, pad, next task ts, next task id, free heap, uptime
+    STATUS_BIN_HEADER = '<BBHhhBxiiII'
+    
+    # Initial size of the pooled per-connection response buffers; buffers
+    # that had to grow beyond twice this size are not returned to the pool
+    RESPONSE_BUFFER_SIZE = 1024
+    
+    def __init__(self, relay_controller, servo_controller, task_manager=None,
+                 keep_alive_timeout=5, max_keep_alive_requests=100, auto_off=None,
+                 event_bus=None, event_ping_interval=15, websocket_max_message=512,
+                 max_connections=10, request_timeout=5, retry_after=2, max_body=2048):
         """
         Initialize web server with hardware controllers.
         
         Args:
             relay_controller: RelayController instance for device switching
             servo_controller: ServoController instance for servo positioning
+            task_manager: TaskManager instance for the task endpoints (optional)
+            keep_alive_timeout (int): Seconds an idle persistent connection
+                is kept open while waiting for the next request
+            max_keep_alive_requests (int): Requests served on one connection
+                before the server closes it
+            auto_off: AutoOffService shared with the task scheduler
+                (optional, a private one is created if omitted)
+            event_bus: EventBus feeding /events (optional, the endpoint
+                answers 503 without it)
+            event_ping_interval (int): Seconds between keep-alive comments
+                on an idle event stream (and pings on an idle WebSocket)
+            websocket_max_message (int): Largest accepted WebSocket
+                message in bytes
+            max_connections (int): Connections served at once; further
+                connections are answered with 503 right away
+            request_timeout (int): Seconds allowed for reading the headers
+                or the body of a request and for draining a response
+            retry_after (int): Retry-After seconds sent with the 503
+            max_body (int): Largest accepted request body in bytes;
+                larger requests are answered with 413
         """
         self.relay_controller = relay_controller
         self.servo_controller = servo_controller
+        self.task_manager = task_manager
+        self.keep_alive_timeout = keep_alive_timeout
+        self.max_keep_alive_requests = max_keep_alive_requests
+        self.router = Router()
         self.server = None
-        self.auto_off_timers = {}  # Store active auto-off tasks
+        self.auto_off = auto_off or AutoOffService(relay_controller)
+        self.event_bus = event_bus
+        self.event_ping_interval = event_ping_interval
+        self.websocket_max_message = websocket_max_message
+        self.max_connections = max_connections
+        self.request_timeout = request_timeout
+        self.retry_after = retry_after
+        self.max_body = max_body
+        
+        # Connection governor counters, reported by /status
+        self.active_connections = 0
+        self.rejected_connections = 0
+        self.read_timeouts = 0
+        
+        # Response assembly caches
+        self._buffer_pool = []      # Idle ResponseBuffer objects
+        self._header_cache = {}     # (status, content_type, keep_alive) -> header prefix
+        self._constant_cache = {}   # (message, status) -> cached error response
+        self._busy_response = (b"HTTP/1.1 503 Service Unavailable\r\nContent-Type: text/plain\r\n"
+                               b"Content-Length: 11\r\nConnection: close\r\n"
+                               b"Retry-After: %d\r\n\r\nServer busy" % retry_after)
+        
+        # Heap bytes allocated per served request, measured with gc.mem_alloc()
+        self.alloc_requests = 0
+        self.alloc_bytes = 0
+    
+    def register_routes(self, api_routes):
+        """
+        Compile the routing table from route templates.
+        
+        Called once while the server is being set up. Each entry of
+        ``api_routes`` whose name appears in ``ROUTE_HANDLERS`` is bound to
+        its handler; unknown names are ignored.
+        
+        Args:
+            api_routes (dict): Route name to path template, e.g.
+                config.API_ROUTES
+        """
+        for name, template in api_routes.items():
+            if name not in self.ROUTE_HANDLERS:
+                continue
+            methods, handler_name = self.ROUTE_HANDLERS[name]
+            handler = getattr(self, handler_name)
+            for method in methods:
+                self.router.add(method, template, handler)
         
     async def handle_request(self, reader, writer):
         """
         Asynchronously process incoming HTTP requests.
         
-        Parses HTTP request headers, routes to appropriate handlers,
-        and sends JSON responses. Handles errors gracefully and
-        ensures proper connection cleanup.
+        Serves requests on a persistent (HTTP/1.1 keep-alive) connection
+        until the client asks to close it, the idle timeout expires or the
+        per-connection request limit is reached. Pipelined requests are
+        answered strictly in arrival order because each request (including
+        its body) is fully consumed from the stream before the next one is
+        parsed.
+        
+        Admission control: while ``max_connections`` connections are being
+        served, a new one is answered with 503 and Retry-After without
+        reading its request. Headers and body must arrive within
+        ``request_timeout`` seconds, so a stalled client cannot pin a slot.
+        A malformed request line (400), a body larger than ``max_body``
+        (413) or a negative or malformed Content-Length (400) is refused
+        and the connection closed.
         
         Args:
             reader: AsyncIO stream reader for request data
             writer: AsyncIO stream writer for response data
         """
+        if self.active_connections >= self.max_connections:
+            await self._reject_connection(writer)
+            return
+        
+        self.active_connections += 1
+        buffer = self._acquire_buffer()
+        served = 0
+        pending = True  # A fresh connection owes us its first request
         try:
-            # Read and parse HTTP request line
-            request_line = await reader.readline()
-            request_line = request_line.decode('utf-8').strip()
-            
-            # Extract HTTP method, path, and version
-            method, path, _ = request_line.split(' ')
-            
-            # Read and discard HTTP headers (simple implementation)
             while True:
-                line = await reader.readline()
-                if line == b'\r\n':
+                # Wait for the next request line; an idle client is dropped
+                request_line = await asyncio.wait_for(
+                    reader.readline(), self.keep_alive_timeout
+                )
+                if not request_line:
+                    break  # Client closed the connection
+                request_line = request_line.strip()
+                if not request_line:
+                    continue  # Tolerate stray CRLF between pipelined requests
+                pending = True
+                
+                # Extract HTTP method, path, and version
+                try:
+                    method, path, version = request_line.decode('utf-8').split(' ')
+                except ValueError:  # Wrong field count or invalid UTF-8
+                    version = None
+                if not version or not version.startswith('HTTP/'):
+                    # Nothing after a garbled request line can be trusted
+                    await self._send_response(
+                        writer, self._constant_error("Malformed request line", "400 Bad Request"),
+                        False, buffer)
+                    pending = False
                     break
+                
+                # Read headers and the request body, if any, within the deadline
+                headers = await asyncio.wait_for(self._read_headers(reader), self.request_timeout)
+                content_length = headers.get('content-length', '0').strip()
+                if not content_length.isdigit():
+                    rejection = self._constant_error("Invalid Content-Length", "400 Bad Request")
+                elif int(content_length) > self.max_body:
+                    rejection = self._constant_error("Request body too large",
+                                                     "413 Payload Too Large")
+                else:
+                    rejection = None
+                if rejection is not None:
+                    # The body stays unread, so the stream cannot carry another request
+                    await self._send_response(writer, rejection, False, buffer)
+                    pending = False
+                    break
+                content_length = int(content_length)
+                body = b''
+                if content_length > 0:
+                    body = await asyncio.wait_for(reader.readexactly(content_length),
+                                                  self.request_timeout)
+                
+                served += 1
+                keep_alive = (self._wants_keep_alive(version, headers) and
+                              served < self.max_keep_alive_requests)
+                
+                # Parse URL parameters if present
+                if '?' in path:
+                    path, params = path.split('?', 1)
+                    params = self._parse_params(params)
+                else:
+                    params = {}
+                
+                # Route request to appropriate handler and send the response
+                alloc_before = gc.mem_alloc()
+                request = Request(method, path, params, headers, body, reader, writer)
+                response = await self._route_request(request)
+                if response is None:
+                    break  # Handler took the connection over (event stream)
+                if response[0].startswith("503"):
+                    keep_alive = False  # Give the slot back while the server is saturated
+                await self._send_response(writer, response, keep_alive, buffer)
+                pending = False
+                self._count_alloc(gc.mem_alloc() - alloc_before)
+                
+                if not keep_alive:
+                    break
+                
+        except asyncio.TimeoutError:
+            # An idle persistent connection is closed quietly; a client that
+            # never finished its request or stopped reading is counted
+            if pending:
+                self.read_timeouts += 1
+        except Exception as e:
+            # Handle errors with 500 Internal Server Error response
+            try:
+                await self._send_response(
+                    writer,
+                    ("500 Internal Server Error", "text/plain", f"Error: {str(e)}"),
+                    False,
+                    buffer
+                )
+            except Exception:
+                pass
+        finally:
+            self.active_connections -= 1
+            self._release_buffer(buffer)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass  # Peer reset the connection
+    
+    async def _reject_connection(self, writer):
+        """
+        Turn away a connection while all slots are busy.
+        
+        The pre-rendered 503 is written without reading the request, and
+        the write is bounded by ``request_timeout`` so a client that does
+        not read cannot stall the rejection either.
+        
+        Args:
+            writer: AsyncIO stream writer of the rejected connection
+        """
+        self.rejected_connections += 1
+        try:
+            writer.write(self._busy_response)
+            await asyncio.wait_for(writer.drain(), self.request_timeout)
+        except Exception:
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except Exception:
+                pass
+    
+    def _acquire_buffer(self):
+        """
+        Take a response buffer from the pool, allocating one if it is empty.
+        
+        Returns:
+            ResponseBuffer: Buffer owned by the calling connection
+        """
+        if self._buffer_pool:
+            return self._buffer_pool.pop()
+        return ResponseBuffer(self.RESPONSE_BUFFER_SIZE)
+    
+    def _release_buffer(self, buffer):
+        """
+        Return a response buffer to the pool.
+        
+        Buffers that grew for an unusually large response are dropped so
+        the pool does not pin that memory.
+        
+        Args:
+            buffer (ResponseBuffer): Buffer from ``_acquire_buffer``
+        """
+        if (len(self._buffer_pool) < self.max_connections and
+                len(buffer) <= 2 * self.RESPONSE_BUFFER_SIZE):
+            self._buffer_pool.append(buffer)
+    
+    def _count_alloc(self, allocated):
+        """
+        Record the heap bytes allocated while serving one request.
+        
+        Samples during which the garbage collector ran (negative deltas)
+        are ignored.
+        
+        Args:
+            allocated (int): gc.mem_alloc() difference across the request
+        """
+        if allocated >= 0:
+            self.alloc_requests += 1
+            self.alloc_bytes += allocated
+    
+    async def _read_headers(self, reader):
+        """
+        Read HTTP request headers up to the blank line.
+        
+        Args:
+            reader: AsyncIO stream reader positioned after the request line
             
-            # Parse URL parameters if present
-            if '?' in path:
-                path, params = path.split('?', 1)
-                params = self._parse_params(params)
-            else:
-                params = {}
+        Returns:
+            dict: Header names (lower-cased) mapped to their values
+        """
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if not line or line == b'\r\n':
+                break
+            line = line.decode('utf-8')
+            if ':' in line:
+                name, value = line.split(':', 1)
+                headers[name.strip().lower()] = value.strip()
+        return headers
+    
+    def _wants_keep_alive(self, version, headers):
+        """
+        Decide whether the client expects a persistent connection.
+        
+        HTTP/1.1 connections are persistent unless the client sends
+        ``Connection: close``; HTTP/1.0 clients must opt in explicitly.
+        
+        Args:
+            version (str): HTTP version from the request line
+            headers (dict): Parsed request headers
             
-            # Route request to appropriate handler
-            response = await self._route_request(method, path, params)
+        Returns:
+            bool: True if the connection should be kept open
+        """
+        connection = headers.get('connection', '').lower()
+        if version == 'HTTP/1.1':
+            return connection != 'close'
+        return connection == 'keep-alive'
+    
+    async def _send_response(self, writer, response, keep_alive, buffer):
+        """
+        Write a complete HTTP response with framing headers.
+        
+        Every response carries ``Content-Length`` so the client can find
+        the end of the body without the server closing the connection.
+        The body is serialized into the connection's response buffer and
+        the header (a cached prefix plus the length) is prepended in
+        front of it, so the response leaves in a single write.
+        
+        Args:
+            writer: AsyncIO stream writer for response data
+            response (tuple): (status, content_type, body) with an optional
+                fourth element holding a dict of extra headers; body may be
+                str, bytes, or a dict/list serialized as JSON
+            keep_alive (bool): Whether the connection stays open afterwards
+            buffer (ResponseBuffer): Response buffer of the connection
+        """
+        status, content_type, body = response[0], response[1], response[2]
+        buffer.reset()
+        if isinstance(body, (dict, list)):
+            json.dump(body, buffer)
+        else:
+            buffer.write(body)
+        
+        fits = buffer.prepend(b"\r\n")
+        if len(response) > 3:
+            for name, value in response[3].items():
+                fits = fits and buffer.prepend(f"{name}: {value}\r\n".encode('utf-8'))
+        fits = (fits and buffer.prepend(b"%d\r\n" % buffer.body_length()) and
+                buffer.prepend(self._header_prefix(status, content_type, keep_alive)))
+        if not fits:
+            raise ValueError("Response headers exceed buffer headroom")
+        
+        writer.write(buffer.getvalue())
+        await asyncio.wait_for(writer.drain(), self.request_timeout)
+    
+    def _header_prefix(self, status, content_type, keep_alive):
+        """
+        Get the pre-rendered header lines up to ``Content-Length: ``.
+        
+        Rendered once per status, content type and connection mode.
+        
+        Args:
+            status (str): Status code and reason
+            content_type (str): Content-Type of the body
+            keep_alive (bool): Whether the connection stays open
             
-            # Send HTTP response
-            writer.write(response.encode('utf-8'))
-            await writer.drain()
-            await writer.wait_closed()
+        Returns:
+            bytes: Status line and fixed headers
+        """
+        key = (status, content_type, keep_alive)
+        prefix = self._header_cache.get(key)
+        if prefix is None:
+            header = f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+            if keep_alive:
+                header += ("Connection: keep-alive\r\n"
+                           f"Keep-Alive: timeout={self.keep_alive_timeout}, max={self.max_keep_alive_requests}\r\n")
+            else:
+                header += "Connection: close\r\n"
+            prefix = (header + "Content-Length: ").encode('utf-8')
+            self._header_cache[key] = prefix
+        return prefix
+    
+    def _json_response(self, data, status="200 OK"):
+        """
+        Build a JSON response tuple for ``_send_response``.
+        
+        The data is serialized by ``_send_response`` directly into the
+        connection's response buffer.
+        
+        Args:
+            data (dict): Response data to serialize
+            status (str): Status code and reason
             
-        except Exception as e:
-            # Handle errors with 500 Internal Server Error response
-            error_response = f"HTTP/1.1 500 Internal Server Error\r\nContent-Type: text/plain\r\n\r\nError: {str(e)}"
-            writer.write(error_response.encode('utf-8'))
-            await writer.drain()
-            await writer.wait_closed()
+        Returns:
+            tuple: (status, content_type, data)
+        """
+        return status, "application/json", data
+    
+    def _constant_error(self, message, status="200 OK"):
+        """
+        Get a cached JSON error response with a fixed message.
+        
+        The body is serialized on first use only.
+        
+        Args:
+            message (str): Constant error message
+            status (str): Status code and reason
+            
+        Returns:
+            tuple: (status, content_type, body bytes)
+        """
+        key = (message, status)
+        response = self._constant_cache.get(key)
+        if response is None:
+            body = json.dumps({"status": "error", "message": message}).encode('utf-8')
+            response = (status, "application/json", body)
+            self._constant_cache[key] = response
+        return response
     
     def _parse_params(self, param_string):
         """
@@ -137,182 +680,811 @@ class WebServer:
         for param in param_string.split('&'):
             if '=' in param:
                 key, value = param.split('=', 1)
-                params[key] = value
+                params[self._unquote(key)] = self._unquote(value)
         return params
     
-    async def _route_request(self, method, path, params):
+    def _unquote(self, value):
+        """
+        Decode a percent-encoded URL component.
+        
+        HTTP client libraries escape characters such as ':' and ',' in query
+        values (e.g. ``set=0%3Aon%2C1%3Aoff``), so values are decoded before
+        handlers see them.
+        
+        Args:
+            value (str): Raw URL component
+            
+        Returns:
+            str: Decoded component
+        """
+        value = value.replace('+', ' ')
+        if '%' not in value:
+            return value
+        parts = value.split('%')
+        decoded = [parts[0]]
+        for part in parts[1:]:
+            try:
+                decoded.append(chr(int(part[:2], 16)) + part[2:])
+            except ValueError:
+                decoded.append('%' + part)
+        return ''.join(decoded)
+    
+    async def _route_request(self, request):
         """
         Route HTTP requests to appropriate handler functions.
         
-        Analyzes the request path and directs it to the correct handler
-        function based on the API endpoint structure.
+        Looks the request up in the compiled routing table and calls the
+        matching handler with its typed path arguments. Unknown paths get
+        a 404 and known paths with an unsupported method get a 405.
         
         Args:
-            method (str): HTTP method (GET, POST, etc.)
-            path (str): Request path/endpoint
-            params (dict): URL query parameters
+            request (Request): Parsed HTTP request
             
         Returns:
-            str: Complete HTTP response string
+            tuple or None: (status, content_type, body) for
+            ``_send_response``, or None if the handler already wrote its
+            own response and the connection must be closed
         """
-        if path.startswith('/relay/'):
-            return await self._handle_relay_request(path, params)
-        elif path.startswith('/servo/'):
-            return await self._handle_servo_request(path, params)
-        elif path == '/status':
-            return await self._handle_status_request()
-        else:
-            return "HTTP/1.1 404 Not Found\r\nContent-Type: text/plain\r\n\r\nEndpoint not found"
+        handler, args, allowed = self.router.resolve(request.method, request.path)
+        if handler is None:
+            if allowed:
+                return ("405 Method Not Allowed", "text/plain", "Method not allowed",
+                        {"Allow": ", ".join(allowed)})
+            return "404 Not Found", "text/plain", "Endpoint not found"
+        return await handler(request, **args)
     
-    async def _handle_relay_request(self, path, params):
+    async def _handle_relay_request(self, request, channel, action):
         """
         Process relay control API requests.
         
         Handles HTTP requests for turning relay channels on/off with optional
         duration parameter for automatic shutdown. Supports individual channel
-        control and validates input parameters.
+        control; channel and duration are checked with the same rules as
+        /relay/batch and rejected with 400 Bad Request.
         
         Args:
-            path (str): Request path containing channel and action
-            params (dict): URL parameters including optional duration
+            request (Request): Parsed request; ``params`` may hold a duration
+            channel (int): Relay channel number from the path
+            action (str): "on" or "off"
             
         Returns:
-            str: Complete HTTP response with JSON status
+            tuple: (status, content_type, body) with JSON status
         """
+        if action not in ('on', 'off'):
+            return self._constant_error("Invalid action")
+        
+        commands, results = self._validate_batch([{
+            "channel": channel,
+            "action": action,
+            "duration": request.params.get('duration') if action == 'on' else None,
+        }])
+        if commands is None:
+            return self._json_response({"status": "error", "message": results[0]["message"]},
+                                       "400 Bad Request")
+        
         try:
-            parts = path.split('/')
-            if len(parts) >= 4:
-                channel = int(parts[2])
-                action = parts[3]
-                
-                if action == 'on':
-                    self.relay_controller.on(channel)
-                    
-                    # Handle optional duration parameter for auto-off
-                    if 'duration' in params:
-                        duration = int(params['duration'])
-                        await self.auto_off_relay(channel, duration)
-                    
-                    response_data = {"status": "success", "message": f"Relay {channel} turned ON"}
-                    
-                elif action == 'off':
-                    self.relay_controller.off(channel)
-                    
-                    # Cancel any existing auto-off timer for this channel
-                    if channel in self.auto_off_timers:
-                        self.auto_off_timers[channel].cancel()
-                        del self.auto_off_timers[channel]
-                    
-                    response_data = {"status": "success", "message": f"Relay {channel} turned OFF"}
-                else:
-                    response_data = {"status": "error", "message": "Invalid action"}
-            else:
-                response_data = {"status": "error", "message": "Invalid relay request"}
+            channel, action, duration = commands[0]
+            await self._apply_relay_action(channel, action, duration)
+            response_data = {"status": "success",
+                             "message": f"Relay {channel} turned {action.upper()}"}
+            return self._json_response(response_data)
             
-            json_response = json.dumps(response_data)
-            return f"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n\r\n{json_response}"
+        except Exception as e:
+            error_data = {"status": "error", "message": str(e)}
+            return self._json_response(error_data, "500 Internal Server Error")
+    
+    async def _apply_relay_action(self, channel, action, duration):
+        """
+        Switch one relay channel and manage its auto-off timer.
+        
+        Args:
+            channel (int): Relay channel number
+            action (str): "on" or "off"
+            duration (int or None): Auto-off delay in seconds for "on"
+        """
+        if action == 'on':
+            self.relay_controller.on(channel)
+        else:
+            self.relay_controller.off(channel)
+        self._update_auto_off(channel, action, duration)
+    
+    def _update_auto_off(self, channel, action, duration):
+        """
+        Arm or cancel the auto-off deadline after a relay was switched.
+        
+        Args:
+            channel (int): Relay channel number
+            action (str): "on" or "off"
+            duration (int or None): Auto-off delay in seconds for "on"
+        """
+        if action == 'on':
+            # Handle optional duration parameter for auto-off
+            if duration:
+                self.auto_off.arm(channel, duration)
+        else:
+            # A manual off makes any pending auto-off pointless
+            self.auto_off.cancel(channel)
+    
+    async def _handle_relay_batch(self, request):
+        """
+        Apply several relay changes from one request (/relay/batch).
+        
+        Accepts either a compact query (``?set=0:on,2:off,3:on:30``) or a
+        JSON body listing ``{"channel", "action", "duration"}`` objects.
+        Every entry is validated before any relay is touched, so a batch is
+        applied completely or not at all, and the relays are switched
+        together through ``RelayController.apply_mask``.
+        
+        Args:
+            request (Request): Parsed request carrying the batch
             
+        Returns:
+            tuple: (status, content_type, body) with per-entry JSON results
+        """
+        try:
+            if request.body:
+                entries = json.loads(request.body)
+            elif 'set' in request.params:
+                entries = self._parse_batch_query(request.params['set'])
+            else:
+                entries = None
+            if not isinstance(entries, list) or not entries:
+                return self._constant_error("Empty or malformed batch", "400 Bad Request")
+        except Exception:
+            return self._constant_error("Empty or malformed batch", "400 Bad Request")
+        
+        commands, results = self._validate_batch(entries)
+        if commands is None:
+            return self._json_response({"status": "error", "message": "Invalid batch entries",
+                                        "results": results}, "400 Bad Request")
+        
+        try:
+            self._apply_batch(commands)
         except Exception as e:
             error_data = {"status": "error", "message": str(e)}
-            json_response = json.dumps(error_data)
-            return f"HTTP/1.1 500 Internal Server Error\r\nContent-Type: application/json\r\n\r\n{json_response}"
+            return self._json_response(error_data, "500 Internal Server Error")
+        
+        return self._json_response({"status": "success", "results": results})
+    
+    def _apply_batch(self, commands):
+        """
+        Switch validated relay commands together and update their auto-offs.
+        
+        Args:
+            commands (list): (channel, action, duration) tuples from
+                ``_validate_batch``
+        """
+        # Switch every relay of the batch in a single bank write
+        on_mask = 0
+        off_mask = 0
+        for channel, action, duration in commands:
+            if action == 'on':
+                on_mask |= 1 << channel
+            else:
+                off_mask |= 1 << channel
+        self.relay_controller.apply_mask(on_mask, off_mask)
+        
+        for channel, action, duration in commands:
+            self._update_auto_off(channel, action, duration)
+    
+    def _parse_batch_query(self, value):
+        """
+        Parse the compact ``channel:action[:duration]`` batch syntax.
+        
+        Args:
+            value (str): Comma-separated entries, e.g. "0:on,2:off,3:on:30"
+            
+        Returns:
+            list: Entry dictionaries in the JSON batch format
+        """
+        entries = []
+        for item in value.split(','):
+            fields = item.split(':')
+            entry = {"channel": fields[0], "action": fields[1] if len(fields) > 1 else ''}
+            if len(fields) > 2:
+                entry["duration"] = fields[2]
+            entries.append(entry)
+        return entries
     
-    async def _handle_servo_request(self, path, params):
+    def _validate_batch(self, entries):
+        """
+        Validate batch entries against channel count and device limits.
+        
+        Args:
+            entries (list): Entry dictionaries with channel, action and
+                optional duration
+            
+        Returns:
+            tuple: (commands, results) where commands is a list of
+            (channel, action, duration) tuples, or None if any entry is
+            invalid, and results holds one status dict per entry
+        """
+        commands = []
+        results = []
+        seen = set()
+        valid = True
+        channel_count = len(self.relay_controller.relays)
+        
+        for entry in entries:
+            result = {"status": "success"}
+            try:
+                channel = int(entry['channel'])
+                action = str(entry['action']).lower()
+                duration = entry.get('duration')
+                result.update({"channel": channel, "action": action})
+                if duration in (None, ''):
+                    duration = None
+                elif not str(duration).lstrip('-').isdigit():
+                    raise ValueError("Duration must be a whole number of seconds")
+                else:
+                    duration = int(duration)
+                
+                if not 0 <= channel < channel_count:
+                    raise ValueError("Invalid channel number")
+                if channel in seen:
+                    raise ValueError("Duplicate channel in batch")
+                if action not in ('on', 'off'):
+                    raise ValueError("Invalid action")
+                if duration is not None:
+                    if action != 'on':
+                        raise ValueError("Duration is only valid with 'on'")
+                    device = get_channel_device(channel)
+                    if device is not None:
+                        duration_ok, message = validate_duration(device, duration)
+                        if not duration_ok:
+                            raise ValueError(message)
+                    elif duration <= 0:
+                        raise ValueError("Duration must be positive")
+                    result["duration"] = duration
+                
+                seen.add(channel)
+                commands.append((channel, action, duration))
+            except Exception as e:
+                valid = False
+                result["status"] = "error"
+                result["message"] = str(e) if isinstance(e, ValueError) else "Malformed entry"
+            results.append(result)
+        
+        return (commands if valid else None), results
+    
+    async def _handle_servo_request(self, request, angle):
         """
         Process servo positioning API requests.
         
         Handles HTTP requests for setting servo motor angle position.
         Validates angle range (0-180 degrees) and provides error feedback
-        for invalid inputs.
+        for invalid inputs. The move is executed by the servo motion
+        planner, so the response returns immediately with its motion id.
         
         Args:
-            path (str): Request path containing target angle
-            params (dict): URL parameters (unused for servo requests)
+            request (Request): Parsed request (unused for servo requests)
+            angle (int): Target angle from the path
             
         Returns:
-            str: Complete HTTP response with JSON status
+            tuple: (status, content_type, body) with JSON status
         """
         try:
-            parts = path.split('/')
-            if len(parts) >= 3:
-                angle = int(parts[2])
-                
-                if 0 <= angle <= 180:
-                    self.servo_controller.set_angle(angle)
-                    response_data = {"status": "success", "message": f"Servo set to {angle} degrees"}
-                else:
-                    response_data = {"status": "error", "message": "Invalid angle (0-180)"}
+            if 0 <= angle <= 180:
+                # Smooth move runs in the background; reply right away
+                motion_id = self.servo_controller.move_to(angle)
+                response_data = {"status": "success", "message": f"Servo moving to {angle} degrees",
+                                 "motion_id": motion_id}
             else:
-                response_data = {"status": "error", "message": "Invalid servo request"}
+                return self._constant_error("Invalid angle (0-180)")
             
-            json_response = json.dumps(response_data)
-            return f"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n\r\n{json_response}"
+            return self._json_response(response_data)
             
         except Exception as e:
             error_data = {"status": "error", "message": str(e)}
-            json_response = json.dumps(error_data)
-            return f"HTTP/1.1 500 Internal Server Error\r\nContent-Type: application/json\r\n\r\n{json_response}"
+            return self._json_response(error_data, "500 Internal Server Error")
     
-    async def _handle_status_request(self):
+    async def _handle_status_request(self, request):
         """
         Process system status API requests.
         
-        Returns current system status including time information and
-        operational status of hardware components. Provides a health
-        check endpoint for monitoring system state.
+        Reports the actual relay states, remaining auto-off time per
+        channel, servo position, next scheduled task, free heap and uptime.
+        ``?fmt=csv`` and ``?fmt=bin`` select compact fixed-layout variants
+        for frequent polling (see STATUS_CSV_FIELDS and STATUS_BIN_HEADER).
+        
+        Args:
+            request (Request): Parsed request, optionally with a 'fmt' parameter
         
         Returns:
-            str: Complete HTTP response with JSON system status
+            tuple: (status, content_type, body) with the system status
         """
         try:
-            current_time = time.localtime()
-            status_data = {
-                "status": "success",
-                "time": {
-                    "year": current_time[0],
-                    "month": current_time[1],
-                    "day": current_time[2],
-                    "hour": current_time[3],
-                    "minute": current_time[4],
-                    "second": current_time[5]
-                },
-                "relays": "operational",
-                "servo": "operational"
-            }
-            
-            json_response = json.dumps(status_data)
-            return f"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n\r\n{json_response}"
+            fmt = request.params.get('fmt', 'json')
+            if fmt == 'csv':
+                return "200 OK", "text/csv", self._status_csv()
+            if fmt == 'bin':
+                return "200 OK", "application/octet-stream", self._status_bin()
+            if fmt != 'json':
+                return self._constant_error("Unknown status format", "400 Bad Request")
+            return self._json_response(self._status_json())
             
         except Exception as e:
             error_data = {"status": "error", "message": str(e)}
-            json_response = json.dumps(error_data)
-            return f"HTTP/1.1 500 Internal Server Error\r\nContent-Type: application/json\r\n\r\n{json_response}"
+            return self._json_response(error_data, "500 Internal Server Error")
+    
+    def _status_values(self):
+        """
+        Collect the raw values shared by all status formats.
+        
+        Returns:
+            tuple: (mask, remaining, angle, target, moving, next_task, free, uptime)
+            where remaining lists seconds left per relay channel (None if
+            no auto-off is armed) and next_task is a task dict or None
+        """
+        mask = self.relay_controller.state()
+        armed = self.auto_off.snapshot()
+        remaining = [armed.get(channel) for channel in range(len(self.relay_controller.pins))]
+        
+        servo = self.servo_controller
+        angle = servo.angle if servo else None
+        target = servo.target if servo else None
+        moving = servo.is_moving() if servo else False
+        
+        next_task = None
+        if self.task_manager is not None:
+            next_task = self.task_manager.next_task(time.time())
+        
+        uptime = self.auto_off.now_ms() // 1000
+        return mask, remaining, angle, target, moving, next_task, gc.mem_free(), uptime
+    
+    def _status_json(self):
+        """
+        Build the JSON status document.
+        
+        Returns:
+            dict: Status data for /status
+        """
+        mask, remaining, angle, target, moving, next_task, free, uptime = self._status_values()
+        current_time = time.localtime()
+        
+        if next_task is not None:
+            next_task = {key: next_task[key] for key in ('id', 'device', 'date', 'time', 'duration', 'ts')}
+        
+        return {
+            "status": "success",
+            "time": {
+                "year": current_time[0],
+                "month": current_time[1],
+                "day": current_time[2],
+                "hour": current_time[3],
+                "minute": current_time[4],
+                "second": current_time[5],
+                "formatted": format_time()
+            },
+            "relay_mask": mask,
+            "relay_states": [bool(mask >> channel & 1) for channel in range(len(remaining))],
+            "auto_off_remaining": remaining,
+            "servo": {"angle": angle, "target": target, "moving": moving},
+            "next_task": next_task,
+            "memory": {
+                "free": free,
+                "used": gc.mem_alloc(),
+                "alloc_per_request": self.alloc_bytes // self.alloc_requests if self.alloc_requests else None
+            },
+            "connections": {
+                "active": self.active_connections,
+                "max": self.max_connections,
+                "rejected": self.rejected_connections,
+                "timeouts": self.read_timeouts
+            },
+            "uptime": uptime
+        }
+    
+    def _status_csv(self):
+        """
+        Build the single-line CSV status.
+        
+        Missing values are written as -1; the per-channel remaining
+        seconds follow the fixed fields in channel order.
+        
+        Returns:
+            str: Comma-separated values in STATUS_CSV_FIELDS order
+        """
+        mask, remaining, angle, target, moving, next_task, free, uptime = self._status_values()
+        fields = [
+            mask,
+            -1 if angle is None else int(angle),
+            -1 if target is None else int(target),
+            1 if moving else 0,
+            -1 if next_task is None else next_task['ts'],
+            -1 if next_task is None else next_task['id'],
+            free,
+            uptime
+        ]
+        fields.extend(-1 if left is None else left for left in remaining)
+        return ','.join(str(value) for value in fields) + '\n'
+    
+    def _status_bin(self):
+        """
+        Build the packed binary status.
+        
+        Layout: STATUS_BIN_HEADER followed by one signed 32-bit remaining
+        time per relay channel; missing values are -1.
+        
+        Returns:
+            bytes: Little-endian packed status
+        """
+        mask, remaining, angle, target, moving, next_task, free, uptime = self._status_values()
+        payload = struct.pack(
+            self.STATUS_BIN_HEADER,
+            self.STATUS_BIN_VERSION,
+            len(remaining),
+            mask,
+            -1 if angle is None else int(angle),
+            -1 if target is None else int(target),
+            1 if moving else 0,
+            -1 if next_task is None else next_task['ts'],
+            -1 if next_task is None else next_task['id'],
+            free,
+            uptime
+        )
+        return payload + struct.pack('<%di' % len(remaining),
+                                     *[-1 if left is None else left for left in remaining])
+    
+    def _subscribe(self, request):
+        """
+        Register a streaming client on the event bus.
+        
+        Args:
+            request (Request): Request with an optional ``topics`` parameter
+            
+        Returns:
+            tuple: (Subscription, None) on success, or (None, response)
+            with a 400 or 503 error response
+        """
+        if self.event_bus is None:
+            return None, self._constant_error("Event stream unavailable", "503 Service Unavailable")
+        try:
+            topics = parse_topics(request.params.get('topics'))
+        except ValueError as e:
+            return None, self._json_response({"status": "error", "message": str(e)},
+                                             "400 Bad Request")
+        subscription = self.event_bus.subscribe(topics)
+        if subscription is None:
+            return None, self._constant_error("Too many event subscribers", "503 Service Unavailable")
+        return subscription, None
+    
+    async def _handle_events(self, request):
+        """
+        Stream device state changes as Server-Sent Events (/events).
+        
+        Takes the connection over: sends a full "status" event first, then
+        one event per change published on the event bus (relays, servo,
+        auto_off, tasks, task_run). The optional ``topics`` parameter
+        (e.g. ``?topics=relays,servo``) limits the stream to those topics.
+        A comment line is sent when the stream is idle so dead clients are
+        detected. A slow client's queue is coalesced and, on overflow, a
+        "resync" event asks it to reload /status.
+        
+        Args:
+            request (Request): Parsed request carrying the connection writer
+            
+        Returns:
+            tuple or None: 400 response for unknown topics, 503 response if
+            no event bus is configured or all subscriber slots are taken,
+            otherwise None once the client has disconnected
+        """
+        subscription, error = self._subscribe(request)
+        if error:
+            return error
+        
+        writer = request.writer
+        try:
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                         b"Cache-Control: no-cache\r\nConnection: close\r\n\r\n")
+            writer.write(f"event: status\ndata: {json.dumps(self._status_json())}\n\n".encode('utf-8'))
+            await asyncio.wait_for(writer.drain(), self.request_timeout)
+            
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.get(), self.event_ping_interval)
+                except asyncio.TimeoutError:
+                    writer.write(b": ping\n\n")
+                else:
+                    writer.write(event.sse())
+                await asyncio.wait_for(writer.drain(), self.request_timeout)
+        except (OSError, asyncio.TimeoutError):
+            pass  # Client went away or stopped reading
+        finally:
+            self.event_bus.unsubscribe(subscription)
+        return None
+    
+    async def _handle_websocket(self, request):
+        """
+        Upgrade to the WebSocket control channel (/ws).
+        
+        Each text message is one command, answered with an ack carrying
+        the same sequence number; state changes from the event bus are
+        pushed as ``E <event> <json>`` messages on the same socket. The
+        optional ``topics`` parameter selects the pushed topics as for
+        /events.
+        
+        Commands:
+            <seq> R <channel> on|off [duration]   - switch one relay
+            <seq> B 0:on,2:off,3:on:30             - batch, as /relay/batch?set=
+            <seq> S <angle>                        - smooth servo move
+            <seq> P                                - status line (fmt=csv layout)
+        
+        Acks:
+            A <seq> OK [result]
+            A <seq> ERR <message>
+        
+        Args:
+            request (Request): Upgrade request carrying the connection streams
+            
+        Returns:
+            tuple or None: 400 response if the request is not a valid
+            upgrade or names unknown topics, 503 response if all subscriber
+            slots are taken, otherwise None once the socket has closed
+        """
+        subscription = None
+        if self.event_bus is not None:
+            subscription, error = self._subscribe(request)
+            if error:
+                return error
+        
+        # The peer must answer one of two consecutive pings (or send anything)
+        ws = AsyncWebSocket(request.reader, request.writer, self.websocket_max_message,
+                            write_timeout=self.request_timeout,
+                            idle_timeout=2 * self.event_ping_interval + self.request_timeout)
+        if not await ws.handshake(request.headers):
+            if subscription is not None:
+                self.event_bus.unsubscribe(subscription)
+            return "400 Bad Request", "text/plain", "WebSocket upgrade required"
+        
+        pusher = asyncio.create_task(self._push_events(ws, subscription))
+        try:
+            while True:
+                message = await ws.recv()
+                if message is None:
+                    break
+                if isinstance(message, str):
+                    await ws.send(self._run_ws_command(message))
+        except OSError:
+            pass  # Client went away
+        finally:
+            pusher.cancel()
+            if subscription is not None:
+                self.event_bus.unsubscribe(subscription)
+            await ws.close()
+        return None
+    
+    async def _push_events(self, ws, subscription):
+        """
+        Forward event bus events to a WebSocket, pinging while idle.
+        
+        A ping also goes out at least every ``event_ping_interval`` while
+        events keep flowing, so a live client always has something to
+        answer before the socket's idle deadline.
+        
+        Args:
+            ws (AsyncWebSocket): Open WebSocket
+            subscription (Subscription or None): Event bus subscription;
+                with None the socket is only pinged
+        """
+        interval_ms = self.event_ping_interval * 1000
+        last_ping = time.ticks_ms()
+        try:
+            while not ws.closed:
+                if subscription is None:
+                    await asyncio.sleep(self.event_ping_interval)
+                    await ws.ping()
+                    continue
+                try:
+                    event = await asyncio.wait_for(subscription.get(), self.event_ping_interval)
+                except asyncio.TimeoutError:
+                    event = None
+                else:
+                    await ws.send_text(event.ws())
+                if event is None or time.ticks_diff(time.ticks_ms(), last_ping) >= interval_ms:
+                    await ws.ping()
+                    last_ping = time.ticks_ms()
+        except OSError:
+            pass  # Client went away
+        except Exception:
+            # Never leave the socket open without its event feed
+            await ws.close(1011)
+    
+    def _run_ws_command(self, message):
+        """
+        Execute one WebSocket command and build its ack.
+        
+        Args:
+            message (str): Command text, e.g. "12 R 0 on 30"
+            
+        Returns:
+            str: Ack message for the command's sequence number
+        """
+        parts = message.split()
+        if len(parts) < 2:
+            return "A - ERR Malformed command"
+        seq, command, args = parts[0], parts[1].upper(), parts[2:]
+        
+        try:
+            if command == 'R' and 2 <= len(args) <= 3:
+                entry = {"channel": args[0], "action": args[1]}
+                if len(args) == 3:
+                    entry["duration"] = args[2]
+                return self._ws_relay_batch(seq, [entry])
+            if command == 'B' and len(args) == 1:
+                return self._ws_relay_batch(seq, self._parse_batch_query(args[0]))
+            if command == 'S' and len(args) == 1:
+                angle = int(args[0])
+                if not 0 <= angle <= 180:
+                    return f"A {seq} ERR Invalid angle (0-180)"
+                return f"A {seq} OK {self.servo_controller.move_to(angle)}"
+            if command == 'P' and not args:
+                return f"A {seq} OK {self._status_csv().strip()}"
+            return f"A {seq} ERR Unknown command"
+        except Exception as e:
+            return f"A {seq} ERR {e}"
+    
+    def _ws_relay_batch(self, seq, entries):
+        """
+        Validate and apply relay entries for a WebSocket command.
+        
+        Args:
+            seq (str): Command sequence number
+            entries (list): Entry dictionaries in the JSON batch format
+            
+        Returns:
+            str: Ack with the new relay mask, or the first validation error
+        """
+        commands, results = self._validate_batch(entries)
+        if commands is None:
+            for result in results:
+                if result["status"] == "error":
+                    return f"A {seq} ERR {result['message']}"
+        self._apply_batch(commands)
+        return f"A {seq} OK {self.relay_controller.state()}"
+    
+    async def _handle_legacy_pump(self, request, id, action='on', duration=None):
+        """
+        Process legacy pump control requests (/api/pump/...).
+        
+        Maps the 1-based pump number to its relay channel and delegates to
+        the relay handler, so both API generations share one code path.
+        
+        Args:
+            request (Request): Parsed request
+            id (int): Pump number (1-3)
+            action (str): "on" or "off" (the timed route implies "on")
+            duration (int, optional): Auto-off delay from the timed route
+            
+        Returns:
+            tuple: (status, content_type, body) with JSON status
+        """
+        return await self._handle_legacy_device(request, f"pump{id}", action, duration)
+    
+    async def _handle_legacy_dcmotor(self, request, action='on', duration=None):
+        """
+        Process legacy DC motor control requests (/api/dcmotor/...).
+        
+        Args:
+            request (Request): Parsed request
+            action (str): "on" or "off" (the timed route implies "on")
+            duration (int, optional): Auto-off delay from the timed route
+            
+        Returns:
+            tuple: (status, content_type, body) with JSON status
+        """
+        return await self._handle_legacy_device(request, 'dcmotor', action, duration)
+    
+    async def _handle_legacy_device(self, request, device, action, duration):
+        """
+        Resolve a device name to its relay channel and switch it.
+        
+        Args:
+            request (Request): Parsed request
+            device (str): Device name from config.DEVICE_CONFIG
+            action (str): "on" or "off"
+            duration (int or None): Optional auto-off delay in seconds
+            
+        Returns:
+            tuple: (status, content_type, body) with JSON status
+        """
+        channel = get_device_channel(device)
+        if channel is None:
+            return self._constant_error("Invalid device")
+        if duration is not None:
+            request.params['duration'] = duration
+        return await self._handle_relay_request(request, channel, action)
+    
+    async def _handle_time_request(self, request):
+        """
+        Return the current system time (/api/time).
+        
+        Args:
+            request (Request): Parsed request (unused)
+            
+        Returns:
+            tuple: (status, content_type, body) with JSON time data
+        """
+        return self._json_response({
+            "status": "success",
+            "timestamp": time.time(),
+            "formatted": format_time()
+        })
+    
+    async def _handle_task_list(self, request):
+        """
+        Return all scheduled tasks (/api/tasks).
+        
+        Args:
+            request (Request): Parsed request (unused)
+            
+        Returns:
+            tuple: (status, content_type, body) with JSON task list
+        """
+        if self.task_manager is None:
+            return self._constant_error("Task manager unavailable", "503 Service Unavailable")
+        return self._json_response({"status": "success", "tasks": self.task_manager.get_tasks()})
+    
+    async def _handle_task_add(self, request):
+        """
+        Add a scheduled task from a JSON request body (/api/task/add).
+        
+        Args:
+            request (Request): Parsed request whose body holds date, time,
+                device, duration and an optional repeat rule
+            
+        Returns:
+            tuple: (status, content_type, body) with JSON status
+        """
+        if self.task_manager is None:
+            return self._constant_error("Task manager unavailable", "503 Service Unavailable")
+        try:
+            task_data = json.loads(request.body)
+        except Exception:
+            return self._constant_error("Invalid JSON body", "400 Bad Request")
+        
+        valid, message = validate_task_data(task_data)
+        if not valid:
+            return self._json_response({"status": "error", "message": message}, "400 Bad Request")
+        
+        try:
+            task_id = self.task_manager.add_task(task_data['date'], task_data['time'],
+                                                 task_data['device'], int(task_data['duration']),
+                                                 task_data.get('repeat'))
+        except ValueError as e:
+            return self._json_response({"status": "error", "message": str(e)}, "409 Conflict")
+        return self._json_response({"status": "success", "message": "Task scheduled successfully",
+                                    "id": task_id})
+    
+    async def _handle_task_delete(self, request, id):
+        """
+        Delete a scheduled task (/api/task/<id>/delete).
+        
+        Args:
+            request (Request): Parsed request (unused)
+            id (int): Stable task id as returned by /api/tasks or /api/task/add
+            
+        Returns:
+            tuple: (status, content_type, body) with JSON status
+        """
+        if self.task_manager is None:
+            return self._constant_error("Task manager unavailable", "503 Service Unavailable")
+        if self.task_manager.delete_task_by_id(id):
+            return self._json_response({"status": "success", "message": "Task deleted successfully"})
+        return self._constant_error("Task not found", "404 Not Found")
     
     async def auto_off_relay(self, channel, duration):
         """
-        Create asynchronous task for automatic relay shutdown.
+        Schedule automatic relay shutdown.
         
-        Creates a background task that will automatically turn off the
-        specified relay channel after the given duration. Cancels any
-        existing auto-off task for the same channel.
+        Arms the channel's deadline in the shared AutoOffService,
+        replacing any earlier deadline for the same channel.
         
         Args:
             channel (int): Relay channel number to control
             duration (int): Delay before automatic shutdown (seconds)
         """
-        async def auto_off_task():
-            """Internal task function for delayed relay shutdown."""
-            await asyncio.sleep(duration)
-            self.relay_controller.off(channel)
-            if channel in self.auto_off_timers:
-                del self.auto_off_timers[channel]
-        
-        # Cancel existing auto-off timer for this channel
-        if channel in self.auto_off_timers:
-            self.auto_off_timers[channel].cancel()
-        
-        # Create and store new auto-off task
-        self.auto_off_timers[channel] = asyncio.create_task(auto_off_task())
+        self.auto_off.arm(channel, duration)
     
     async def start(self, host='0.0.0.0', port=80):
         """
@@ -326,6 +1498,9 @@ class WebServer:
             host (str): IP address to bind to (default: '0.0.0.0' for all interfaces)
             port (int): TCP port to listen on (default: 80 for HTTP)
         """
+        # Auto-off loop also keeps the uptime clock running
+        self.auto_off.start()
+        
         print(f"🌐 Starting web server on {host}:{port}")
         print(f"🌐 شروع وب‌سرور در {host}:{port}")
         
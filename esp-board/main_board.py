@@ -18,6 +18,7 @@ Features:
 - Graceful error handling and system recovery
 - Memory management and optimization
 - Bilingual support (English/Persian)
+- Live state change events for streaming clients (/events)
 
 Hardware Support:
 - 4-channel relay control for pumps and DC motor
@@ -33,7 +34,7 @@ Dependencies:
 
 import time
 import uasyncio as asyncio
-from machine import Pin, I2C, RTC, Timer
+from machine import Pin, I2C, RTC
 import gc
 import ujson as json
 
@@ -41,9 +42,12 @@ import ujson as json
 import config
 from lib.wifi_manager import WiFiManager
 from lib.relay_controller import RelayController
+from lib.auto_off import AutoOffService
+from lib.event_bus import EventBus
 from lib.servo_controler import ServoController
 from lib.task_manager import TaskManager
 from lib.web_server import WebServer
+from lib.utils import get_channel_device, get_device_channel
 
 class ESP32Controller:
     """
@@ -63,7 +67,8 @@ class ESP32Controller:
         web_server: Asynchronous HTTP server for REST API
         rtc: Real-time clock for system timing
         device_status: Current state tracking for all devices
-        auto_off_timers: Timer objects for automatic device shutdown
+        auto_off: Shared relay auto-off deadline service
+        event_bus: Publisher of device state changes for /events and /ws clients
     """
     
     def __init__(self):
@@ -80,13 +85,20 @@ class ESP32Controller:
         # Initialize component references (will be set during initialization)
         self.wifi_manager = None
         self.relay_controller = None
+        self.auto_off = None
+        web_config = self.config.WEB_SERVER_CONFIG
+        # Streams hold a connection slot while open; leave room for control requests
+        self.event_bus = EventBus(web_config['event_queue_size'],
+                                  max(1, web_config['max_connections'] -
+                                      web_config['reserved_control_connections']))
         self.servo_controller = None
         self.task_manager = None
         self.web_server = None
         self.rtc = RTC()
         
-        # Task scheduler timer for periodic task checking
-        self.task_timer = Timer(0)
+        # Cooperative task scheduler running on the uasyncio event loop
+        self.scheduler_task = None
+        self.task_event = asyncio.Event()  # Set when the task list changes
         
         # Device status tracking dictionary
         self.device_status = {
@@ -95,9 +107,6 @@ class ESP32Controller:
         }
         self.device_status['servo'] = self.config.DEFAULTS['servo_angle']  # Store servo angle
         
-        # Timer objects for automatic device shutdown
-        self.auto_off_timers = {}
-        
     def initialize_hardware(self):
         """
         Initialize all hardware components and controllers.
@@ -115,9 +124,14 @@ class ESP32Controller:
             
             # Initialize 4-channel relay controller for pumps and DC motor
             relay_pins = self.config.HARDWARE_CONFIG['relay_pins']
-            self.relay_controller = RelayController(relay_pins)
+            self.relay_controller = RelayController(
+                relay_pins, self.config.HARDWARE_CONFIG['relay_register_writes'])
             print("✅ Relay controller initialized - کنترل‌کننده رله مقداردهی شد")
             
+            # One deadline service owns every relay auto-off
+            self.auto_off = AutoOffService(self.relay_controller)
+            self.auto_off.on_expire = self._on_auto_off
+            
             # Initialize servo controller with PCA9685 I2C driver
             servo_config = self.config.HARDWARE_CONFIG['servo_config']
             i2c_config = self.config.HARDWARE_CONFIG['i2c_config']
@@ -128,7 +142,10 @@ class ESP32Controller:
                 channel=servo_config['channel'],
                 min_us=servo_config['min_pulse_us'],
                 max_us=servo_config['max_pulse_us'],
-                freq=servo_config['frequency']
+                freq=servo_config['frequency'],
+                max_speed=servo_config['max_speed'],
+                acceleration=servo_config['acceleration'],
+                step_ms=servo_config['step_ms']
             )
             print("✅ Servo controller initialized - کنترل‌کننده سروو مقداردهی شد")
             
@@ -136,10 +153,14 @@ class ESP32Controller:
             task_config = self.config.TASK_CONFIG
             self.task_manager = TaskManager(
                 filename=task_config['filename'], 
-                max_tasks=task_config['max_tasks']
+                max_tasks=task_config['max_tasks'],
+                compact_threshold=task_config['journal_compact_entries']
             )
             print("✅ Task manager initialized - مدیر تسک مقداردهی شد")
             
+            # Report state changes of every component on the event bus
+            self._connect_event_sources()
+            
         except Exception as e:
             print(f"❌ Hardware initialization error: {e}")
             print(f"❌ خطا در مقداردهی سخت‌افزار: {e}")
@@ -191,8 +212,9 @@ class ESP32Controller:
         Configure and initialize the asynchronous web server.
         
         Creates a WebServer instance with relay and servo controller
-        references for device control API endpoints. Prepares the
-        server for handling HTTP requests asynchronously.
+        references for device control API endpoints and compiles its
+        routing table from config.API_ROUTES. Prepares the server for
+        handling HTTP requests asynchronously.
         
         Raises:
             Exception: If web server configuration fails
@@ -202,7 +224,25 @@ class ESP32Controller:
             print("🌐 راه‌اندازی وب‌سرور...")
             
             # Initialize WebServer with relay and servo controllers
-            self.web_server = WebServer(self.relay_controller, self.servo_controller)
+            web_config = self.config.WEB_SERVER_CONFIG
+            self.web_server = WebServer(
+                self.relay_controller,
+                self.servo_controller,
+                task_manager=self.task_manager,
+                keep_alive_timeout=web_config['keep_alive_timeout'],
+                max_keep_alive_requests=web_config['max_keep_alive_requests'],
+                auto_off=self.auto_off,
+                event_bus=self.event_bus,
+                event_ping_interval=web_config['event_ping_interval'],
+                websocket_max_message=web_config['websocket_max_message'],
+                max_connections=web_config['max_connections'],
+                request_timeout=web_config['request_timeout'],
+                retry_after=web_config['retry_after'],
+                max_body=web_config['max_body']
+            )
+            
+            # Compile the routing table once from the configured templates
+            self.web_server.register_routes(self.config.API_ROUTES)
             print("✅ Web server configured - وب‌سرور پیکربندی شد")
             
         except Exception as e:
@@ -210,108 +250,154 @@ class ESP32Controller:
             print(f"❌ خطا در راه‌اندازی وب‌سرور: {e}")
             raise
     
-    def check_scheduled_tasks(self, timer):
+    def check_scheduled_tasks(self):
         """
-        Periodic callback function to check and execute scheduled tasks.
+        Execute every scheduled task that is due.
         
-        This method is called by a timer every minute to check if any
-        scheduled tasks should be executed. Compares current time with
-        task schedule and executes matching tasks automatically.
+        Called by the scheduler coroutine when the next due time is
+        reached. All tasks whose time has passed are taken from the task
+        manager in one batch (a single task file write) and executed in
+        order. Tasks that are late by no more than
+        DEFAULTS['task_check_tolerance'] seconds still run; older ones
+        are dropped as missed.
         
-        Args:
-            timer: Timer object that triggered this callback (unused)
+        Returns:
+            int: Number of tasks executed
         """
+        executed = 0
         try:
-            current_time = time.localtime()
-            current_date = f"{current_time[0]}-{current_time[1]:02d}-{current_time[2]:02d}"
-            current_time_str = f"{current_time[3]:02d}:{current_time[4]:02d}"
-            
-            tasks = self.task_manager.get_tasks()
+            tolerance = self.config.DEFAULTS['task_check_tolerance']
+            due_tasks = self.task_manager.pop_due(time.time(), tolerance)
             
-            for i, task in enumerate(tasks):
-                if task['date'] == current_date and task['time'] == current_time_str:
-                    # Execute matching scheduled task
-                    device = task['device']
-                    duration = task['duration']
-                    
-                    print(f"⏰ Executing scheduled task: {device} for {duration}s")
-                    print(f"⏰ اجرای تسک برنامه‌ریزی شده: {device} برای {duration} ثانیه")
-                    
-                    # Execute device-specific commands
-                    if device == 'pump1':
-                        self.relay_controller.on(0)
-                        self.device_status['pump1'] = True
-                        self._set_auto_off_timer('pump1', 0, duration)
-                    elif device == 'pump2':
-                        self.relay_controller.on(1)
-                        self.device_status['pump2'] = True
-                        self._set_auto_off_timer('pump2', 1, duration)
-                    elif device == 'pump3':
-                        self.relay_controller.on(2)
-                        self.device_status['pump3'] = True
-                        self._set_auto_off_timer('pump3', 2, duration)
-                    elif device == 'dcmotor':
-                        self.relay_controller.on(3)
-                        self.device_status['dcmotor'] = True
-                        self._set_auto_off_timer('dcmotor', 3, duration)
-                    
-                    # Remove executed task from schedule
-                    self.task_manager.delete_task(i)
-                    break  # Process one task per check to avoid index issues
+            for task in due_tasks:
+                if self._execute_task(task):
+                    executed += 1
                     
         except Exception as e:
             print(f"❌ Task execution error: {e}")
             print(f"❌ خطا در اجرای تسک: {e}")
+        
+        return executed
+    
+    def _execute_task(self, task):
+        """
+        Switch on the device of a scheduled task and arm its auto-off.
+        
+        Args:
+            task (dict): Task dictionary with 'device' and 'duration'
+            
+        Returns:
+            bool: True if the device was switched on
+        """
+        device = task['device']
+        duration = task['duration']
+        channel = get_device_channel(device)
+        if channel is None:
+            print(f"⚠️ Unknown device in scheduled task: {device}")
+            print(f"⚠️ دستگاه نامعتبر در تسک برنامه‌ریزی شده: {device}")
+            return False
+        
+        print(f"⏰ Executing scheduled task: {device} for {duration}s")
+        print(f"⏰ اجرای تسک برنامه‌ریزی شده: {device} برای {duration} ثانیه")
+        
+        self.relay_controller.on(channel)
+        self.device_status[device] = True
+        self._set_auto_off_timer(device, channel, duration)
+        self.event_bus.publish('task_run', {"id": task.get('id'), "device": device,
+                                            "duration": duration}, f"task_run:{task.get('id')}")
+        return True
     
     def _set_auto_off_timer(self, device_name, channel, duration):
         """
-        Configure automatic shutdown timer for a specific device.
+        Schedule automatic shutdown for a specific device.
         
-        Creates a one-shot timer that will automatically turn off the
-        specified device after the given duration. Manages timer cleanup
-        and device status updates upon completion.
+        Arms the channel in the shared AutoOffService, so a later timed
+        request from the web API replaces this deadline instead of
+        competing with it.
         
         Args:
             device_name (str): Name identifier for the device
             channel (int): Hardware channel number for relay control
             duration (int): Time in seconds before automatic shutdown
         """
-        def auto_off_callback(timer):
-            self.relay_controller.off(channel)
-            self.device_status[device_name] = False
-            # Clean up timer reference
-            if device_name in self.auto_off_timers:
-                del self.auto_off_timers[device_name]
-        
-        # Cancel existing timer if device is already scheduled
-        if device_name in self.auto_off_timers:
-            self.auto_off_timers[device_name].deinit()
-        
-        # Create and configure new auto-off timer
-        self.auto_off_timers[device_name] = Timer(-1)
-        self.auto_off_timers[device_name].init(
-            mode=Timer.ONE_SHOT,
-            period=duration * 1000,  # Convert seconds to milliseconds
-            callback=auto_off_callback
-        )
+        self.auto_off.arm(channel, duration)
+    
+    def _on_auto_off(self, channel):
+        """
+        Update device status after the auto-off service switched a relay off.
+        
+        Args:
+            channel (int): Relay channel that was switched off
+        """
+        device = get_channel_device(channel)
+        if device in self.device_status:
+            self.device_status[device] = False
+    
+    def _connect_event_sources(self):
+        """
+        Attach event bus publishers to the hardware components.
+        
+        Relay switches, servo moves and auto-off deadline changes are
+        published as they happen; task list changes are published by
+        ``_on_tasks_changed``.
+        """
+        bus = self.event_bus
+        self.relay_controller.listener = lambda mask: bus.publish(
+            'relays', {"mask": mask})
+        self.servo_controller.listener = lambda angle, target, moving: bus.publish(
+            'servo', {"angle": angle, "target": target, "moving": moving})
+        self.auto_off.listener = lambda channel, remaining: bus.publish(
+            'auto_off', {"channel": channel, "remaining": remaining}, f"auto_off:{channel}")
+    
+    def _on_tasks_changed(self):
+        """
+        Wake the scheduler and publish the new task summary.
+        """
+        self.task_event.set()
+        self.event_bus.publish('tasks', {
+            "count": len(self.task_manager.get_tasks()),
+            "next_ts": self.task_manager.next_due(time.time())
+        })
     
     def start_task_scheduler(self):
         """
-        Initialize and start the periodic task scheduler.
+        Initialize and start the task scheduler coroutine.
         
-        Configures a timer that checks for scheduled tasks every minute
-        and executes them automatically. The scheduler runs continuously
-        in the background to enable automated device operations.
+        The scheduler runs as a task on the same uasyncio event loop as the
+        web server, so task execution and task file writes never race the
+        request handlers. Changes to the task list wake it immediately.
         """
         print("📅 Starting task scheduler...")
         print("📅 شروع برنامه‌ریز تسک...")
         
-        # Configure timer to check scheduled tasks every minute
-        self.task_timer.init(
-            mode=Timer.PERIODIC,
-            period=60000,  # 60 seconds interval
-            callback=self.check_scheduled_tasks
-        )
+        self.task_manager.on_change = self._on_tasks_changed
+        self.scheduler_task = asyncio.create_task(self._run_scheduler())
+    
+    async def _run_scheduler(self):
+        """
+        Execute due tasks, then sleep until the next one is due.
+        
+        The sleep is bounded by TASK_CONFIG['check_interval'] so clock
+        corrections (NTP sync) are picked up, and is cut short whenever the
+        task list changes.
+        """
+        max_sleep = self.config.TASK_CONFIG['check_interval']
+        
+        while True:
+            self.check_scheduled_tasks()
+            
+            now = time.time()
+            next_due = self.task_manager.next_due()
+            if next_due is None:
+                delay = max_sleep
+            else:
+                delay = min(max(next_due - now, 1), max_sleep)
+            
+            self.task_event.clear()
+            try:
+                await asyncio.wait_for(self.task_event.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
     
     async def run_async(self):
         """
@@ -402,14 +488,18 @@ class ESP32Controller:
                 self.relay_controller.off_all()
                 print("✅ All relays turned off - همه رله‌ها خاموش شدند")
             
-            # Stop and cleanup all automatic shutdown timers
-            for timer in self.auto_off_timers.values():
-                timer.deinit()
-            self.auto_off_timers.clear()
+            # Release all servo outputs
+            if self.servo_controller:
+                self.servo_controller.release()
+            
+            # Stop the auto-off service and drop pending deadlines
+            if self.auto_off:
+                self.auto_off.stop()
             
-            # Stop task scheduler timer
-            if hasattr(self, 'task_timer'):
-                self.task_timer.deinit()
+            # Stop task scheduler coroutine
+            if self.scheduler_task:
+                self.scheduler_task.cancel()
+                self.scheduler_task = None
             
             # Stop web server and close connections
             if self.web_server:
@@ -0,0 +1,91 @@
+"""
+Shared HTTP Sessions for ESP32 Boards
+
+Process-wide cache of ``requests.Session`` objects, one per board IP, so
+that every page, Streamlit session and background thread talking to the
+same board reuses its keep-alive connections instead of opening a new
+TCP connection (and a new connection pool) for each request.
+
+Features:
+- One session per board, created on first use
+- Thread-safe lookup shared by all pages and threads
+- Connection pool sized for the board (it serves only a few sockets)
+- No transport-level retries; retries and backoff are left to
+  circuit_breaker.call_with_retry
+
+Author: Erfan Mohamadnia
+License: MIT
+Version: 1.0.0
+
+Usage Example:
+    from http_sessions import get_session
+
+    response = get_session("192.168.1.100").get("http://192.168.1.100/status", timeout=5)
+"""
+
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Keep-alive connections kept per board; the ESP32 web server serves
+# WEB_SERVER_CONFIG['max_connections'] (10) sockets in total, shared by
+# every client, so each process keeps only a few of them.
+POOL_MAXSIZE = 4
+
+_lock = threading.Lock()
+_sessions = {}
+
+
+def _create_session():
+    """
+    Create a session with a pool tuned for a single ESP32 board.
+
+    Returns:
+        requests.Session: New session
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_MAXSIZE, max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_session(esp_ip):
+    """
+    Get the shared session of a board, creating it on first use.
+
+    Args:
+        esp_ip (str): Board IP address (optionally with ":port")
+
+    Returns:
+        requests.Session: Session reused by all callers for this board
+    """
+    with _lock:
+        session = _sessions.get(esp_ip)
+        if session is None:
+            session = _create_session()
+            _sessions[esp_ip] = session
+        return session
+
+
+def close_session(esp_ip):
+    """
+    Close and forget the session of a board, e.g. after its IP changed.
+
+    Args:
+        esp_ip (str): Board IP address used with get_session()
+    """
+    with _lock:
+        session = _sessions.pop(esp_ip, None)
+    if session is not None:
+        session.close()
+
+
+def close_all():
+    """Close every cached session."""
+    with _lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for session in sessions:
+        session.close()
@@ -1,10 +1,21 @@
+import asyncio
+import json
 import requests
 import logging
+import threading
 import time
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from dataclasses import dataclass
 from urllib.parse import urljoin
 
+from circuit_breaker import RetryPolicy, CircuitOpenError, breakers, call_with_retry
+from http_sessions import get_session
+
+try:
+    import aiohttp
+except ImportError:  # Only needed by AsyncESP32Client
+    aiohttp = None
+
 @dataclass
 class CommandResponse:
     """Represents the response from ESP32 after sending a command."""
@@ -14,30 +25,161 @@ class CommandResponse:
     error_code: Optional[int] = None
     status_code: Optional[int] = None
 
+@dataclass(frozen=True)
+class CommandDialect:
+    """One URL convention a firmware may use for relay commands."""
+    name: str
+    method: str
+    path: str                       # Template with {device} and {action}
+    supports_duration: bool = False
+
+    def build(self, device_id: int, action: str, duration: int = 0):
+        """
+        Build the request for one command.
+        
+        :param device_id: Device/relay ID
+        :param action: Lower-case action ("on", "off", or "probe")
+        :param duration: Duration in seconds for timed operations
+        :return: (path, POST data or None)
+        """
+        path = self.path.format(device=device_id, action=action)
+        if self.method == "POST":
+            data = {"relay": device_id, "action": action}
+            if duration > 0:
+                data["duration"] = duration
+            return path, data
+        if duration > 0:
+            path += ("&" if "?" in path else "?") + f"duration={duration}"
+        return path, None
+
+
+# Known command conventions, in the order they are tried
+COMMAND_DIALECTS: List[CommandDialect] = [
+    CommandDialect("relay_path", "GET", "/relay/{device}/{action}", True),          # /relay/1/on
+    CommandDialect("relay_suffix", "GET", "/relay{device}/{action}", True),         # /relay1/on
+    CommandDialect("gpio_path", "GET", "/gpio/{device}/{action}"),                  # /gpio/1/on
+    CommandDialect("control_query", "GET", "/control?relay={device}&action={action}", True),
+    CommandDialect("action_suffix", "GET", "/{action}{device}"),                    # /on1
+    CommandDialect("post_relay", "POST", "/relay", True),
+    CommandDialect("post_control", "POST", "/control", True),
+    CommandDialect("post_command", "POST", "/command", True),
+]
+
+# Action sent while probing; firmware answers it with an error, not a switch
+PROBE_ACTION = "probe"
+
+
+def interpret_response(url: str, status_code: int, text: str) -> CommandResponse:
+    """
+    Turn an HTTP answer from the board into a CommandResponse.
+    
+    :param url: Requested URL (for error messages)
+    :param status_code: HTTP status code
+    :param text: Response body
+    :return: CommandResponse with result
+    """
+    # Consider various success conditions
+    if status_code == 200:
+        # Check response content for success indicators
+        content = text.lower()
+        if any(keyword in content for keyword in ["ok", "success", "done", "relay"]):
+            return CommandResponse(
+                True, 
+                "Command executed successfully", 
+                text,
+                status_code=status_code
+            )
+        else:
+            return CommandResponse(
+                True,  # Still consider it success if status is 200
+                "Command sent (no explicit confirmation)",
+                text,
+                status_code=status_code
+            )
+    elif status_code == 404:
+        return CommandResponse(
+            False, 
+            f"Endpoint not found: {url}",
+            text,
+            status_code=status_code
+        )
+    else:
+        return CommandResponse(
+            False,
+            f"HTTP error {status_code}",
+            text,
+            status_code=status_code
+        )
+
+
+class DialectCache:
+    """
+    Thread-safe memory of the command dialect each host answered to.
+    
+    Shared by all clients in the process, so a reconnect (or a new client
+    for the same board) goes straight to the known dialect.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._dialects: Dict[str, CommandDialect] = {}
+    
+    def get(self, host_key: str) -> Optional[CommandDialect]:
+        with self._lock:
+            return self._dialects.get(host_key)
+    
+    def remember(self, host_key: str, dialect: CommandDialect) -> None:
+        with self._lock:
+            self._dialects[host_key] = dialect
+    
+    def invalidate(self, host_key: str) -> None:
+        with self._lock:
+            self._dialects.pop(host_key, None)
+
+
+dialect_cache = DialectCache()
+
+
 class ESP32Client:
     """
     HTTP-based ESP32 client for relay control.
     Communicates with ESP32 web server using HTTP requests.
     """
     
-    def __init__(self, host: str = "192.168.1.100", port: int = 80, timeout: int = 5):
+    def __init__(self, host: str = "192.168.1.100", port: int = 80, timeout: int = 5,
+                 status_ttl: float = 1.0, retry_policy: Optional[RetryPolicy] = None):
         """
         Initialize ESP32 client with connection parameters.
         
         :param host: ESP32 IP address
         :param port: ESP32 web server port (usually 80)
         :param timeout: HTTP request timeout in seconds
+        :param status_ttl: Seconds a /status snapshot is reused by the
+            status and health-check methods
+        :param retry_policy: Backoff for connection failures (default:
+            two attempts); the per-host circuit breaker stops retries
+            once the board is considered down
         """
         self.host = host
         self.port = port
         self.timeout = timeout
         self.base_url = f"http://{host}"
+        self.host_key = f"{host}:{port}"
         self.is_connected = False
         self.logger = logging.getLogger(__name__)
         
-        # Create persistent session for better performance
-        self.session = requests.Session()
-        self.session.timeout = timeout
+        # Keep-alive session shared with every other client of this board
+        self.session = get_session(host if port == 80 else f"{host}:{port}")
+        self.retry_policy = retry_policy or RetryPolicy(max_retries=2)
+        
+        # Cached /status snapshot shared by concurrent callers (single-flight)
+        self.status_ttl = status_ttl
+        self._status_cond = threading.Condition()
+        self._status_snapshot: Optional[CommandResponse] = None
+        self._status_time = 0.0
+        self._status_inflight = False
+        self._status_result: Optional[CommandResponse] = None   # Last fetch, shared with waiters
+        self._status_generation = 0
         
     def connect(self) -> bool:
         """
@@ -61,6 +203,7 @@ class ESP32Client:
                     if response.status_code == 200:
                         self.is_connected = True
                         self.logger.info(f"Successfully connected to ESP32 via {endpoint}")
+                        self._ensure_dialect()
                         return True
                         
                 except requests.exceptions.RequestException:
@@ -71,6 +214,7 @@ class ESP32Client:
             if response.status_code in [200, 404]:  # 404 is also acceptable
                 self.is_connected = True
                 self.logger.info("Successfully connected to ESP32")
+                self._ensure_dialect()
                 return True
             else:
                 self.logger.error(f"Unexpected status code: {response.status_code}")
@@ -87,10 +231,14 @@ class ESP32Client:
             return False
     
     def disconnect(self) -> None:
-        """Close session and mark as disconnected."""
+        """
+        Mark as disconnected.
+        
+        The board's session is shared with other clients and stays open;
+        use http_sessions.close_session() to drop it.
+        """
         self.logger.info("Disconnecting from ESP32")
         self.is_connected = False
-        self.session.close()
     
     def send_device_command(self, device_id: int, action: str, duration: int = 0) -> CommandResponse:
         """
@@ -104,54 +252,82 @@ class ESP32Client:
         if not self.is_connected:
             return CommandResponse(False, "Not connected to ESP32")
         
-        # Try different common ESP32 URL patterns
-        url_patterns = [
-            f"/relay/{device_id}/{action.lower()}",  # /relay/1/on
-            f"/relay{device_id}/{action.lower()}",   # /relay1/on
-            f"/gpio/{device_id}/{action.lower()}",   # /gpio/1/on
-            f"/control?relay={device_id}&action={action.lower()}",  # Query parameters
-            f"/{action.lower()}{device_id}",         # /on1
-        ]
-        
-        # Add duration parameter if specified
-        if duration > 0:
-            url_patterns = [
-                f"/relay/{device_id}/{action.lower()}?duration={duration}",
-                f"/relay{device_id}/{action.lower()}?duration={duration}",
-                f"/control?relay={device_id}&action={action.lower()}&duration={duration}",
-            ]
-        
         self.logger.info(f"Sending command: Device {device_id} -> {action}" + 
                         (f" for {duration}s" if duration > 0 else ""))
         
-        # Try each URL pattern until one works
-        for url_pattern in url_patterns:
-            full_url = urljoin(self.base_url, url_pattern)
-            response = self._send_http_request(full_url, "GET")
-            
+        # Go straight to the dialect this host is known to speak
+        dialect = dialect_cache.get(self.host_key)
+        if dialect is not None and (duration <= 0 or dialect.supports_duration):
+            response = self._send_with_dialect(dialect, device_id, action.lower(), duration)
             if response.success:
-                self.logger.info(f"Command successful using URL: {url_pattern}")
+                self._invalidate_status()
                 return response
-            else:
-                self.logger.debug(f"Failed with URL pattern: {url_pattern}")
-        
-        # If GET requests don't work, try POST
-        for url_pattern in ["/relay", "/control", "/command"]:
-            full_url = urljoin(self.base_url, url_pattern)
-            data = {
-                "relay": device_id,
-                "action": action.lower(),
-            }
-            if duration > 0:
-                data["duration"] = duration
-                
-            response = self._send_http_request(full_url, "POST", data=data)
+            if response.status_code not in (None, 404):
+                return response  # Endpoint exists; the command itself failed
+            
+            # 404 or connection loss: the cached dialect can no longer be trusted
+            self.logger.info(f"Dialect {dialect.name} failed for {self.host_key}, forgetting it")
+            dialect_cache.invalidate(self.host_key)
+            if response.status_code is None:
+                return response  # Host unreachable; scanning would only add timeouts
+        
+        # Unknown dialect: try each pattern until one works and remember it
+        for dialect in COMMAND_DIALECTS:
+            if duration > 0 and not dialect.supports_duration:
+                continue
+            response = self._send_with_dialect(dialect, device_id, action.lower(), duration)
             if response.success:
-                self.logger.info(f"Command successful using POST to: {url_pattern}")
+                self.logger.info(f"Command successful using dialect: {dialect.name}")
+                dialect_cache.remember(self.host_key, dialect)
+                self._invalidate_status()
                 return response
+            self.logger.debug(f"Failed with dialect: {dialect.name}")
+            if response.status_code is None:
+                break  # Host unreachable or circuit open; the breaker decides when to probe again
         
         return CommandResponse(False, "All URL patterns failed")
     
+    def _send_with_dialect(self, dialect: CommandDialect, device_id: int, action: str,
+                           duration: int = 0) -> CommandResponse:
+        """
+        Send one command using a specific dialect.
+        
+        :param dialect: Command dialect to use
+        :param device_id: Device/relay ID
+        :param action: Lower-case action
+        :param duration: Duration in seconds for timed operations
+        :return: CommandResponse with result
+        """
+        path, data = dialect.build(device_id, action, duration)
+        return self._send_http_request(urljoin(self.base_url, path), dialect.method, data=data)
+    
+    def _ensure_dialect(self) -> Optional[CommandDialect]:
+        """
+        Discover the command dialect of the host once and cache it.
+        
+        Each dialect is probed with an invalid action on device 0, which
+        firmware rejects without switching anything. The first dialect
+        whose endpoint exists (any answer other than 404) is remembered.
+        
+        :return: Cached or discovered dialect, None if none answered
+        """
+        dialect = dialect_cache.get(self.host_key)
+        if dialect is not None:
+            return dialect
+        
+        for dialect in COMMAND_DIALECTS:
+            path, data = dialect.build(0, PROBE_ACTION)
+            response = self._send_http_request(urljoin(self.base_url, path), dialect.method, data=data)
+            if response.status_code is None:
+                return None  # Connection problem; try again on the next connect
+            if response.status_code != 404:
+                self.logger.info(f"Discovered command dialect {dialect.name} for {self.host_key}")
+                dialect_cache.remember(self.host_key, dialect)
+                return dialect
+        
+        self.logger.warning(f"No command dialect answered on {self.host_key}")
+        return None
+    
     def _send_http_request(self, url: str, method: str = "GET", data: Optional[Dict] = None) -> CommandResponse:
         """
         Send HTTP request to ESP32.
@@ -164,53 +340,31 @@ class ESP32Client:
         try:
             self.logger.debug(f"Sending {method} request to: {url}")
             
-            if method.upper() == "POST":
-                response = self.session.post(url, data=data, timeout=self.timeout)
-            else:
-                response = self.session.get(url, timeout=self.timeout)
+            def request():
+                if method.upper() == "POST":
+                    return self.session.post(url, data=data, timeout=self.timeout)
+                return self.session.get(url, timeout=self.timeout)
+            
+            # Connection failures are retried with backoff until the host's
+            # circuit opens; after that requests fail fast
+            response = call_with_retry(
+                self.host_key, request, self.retry_policy,
+                retry_on=(requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+            )
             
             self.logger.debug(f"Response status: {response.status_code}")
             self.logger.debug(f"Response content: {response.text[:200]}")  # First 200 chars
             
-            # Consider various success conditions
-            if response.status_code == 200:
-                # Check response content for success indicators
-                content = response.text.lower()
-                if any(keyword in content for keyword in ["ok", "success", "done", "relay"]):
-                    return CommandResponse(
-                        True, 
-                        "Command executed successfully", 
-                        response.text,
-                        status_code=response.status_code
-                    )
-                else:
-                    return CommandResponse(
-                        True,  # Still consider it success if status is 200
-                        "Command sent (no explicit confirmation)",
-                        response.text,
-                        status_code=response.status_code
-                    )
-            elif response.status_code == 404:
-                return CommandResponse(
-                    False, 
-                    f"Endpoint not found: {url}",
-                    response.text,
-                    status_code=response.status_code
-                )
-            else:
-                return CommandResponse(
-                    False,
-                    f"HTTP error {response.status_code}",
-                    response.text,
-                    status_code=response.status_code
-                )
+            return interpret_response(url, response.status_code, response.text)
                 
+        except CircuitOpenError as e:
+            self.logger.warning(str(e))
+            return CommandResponse(False, str(e))
         except requests.exceptions.Timeout:
             self.logger.error(f"Request timeout for URL: {url}")
             return CommandResponse(False, "Request timeout")
         except requests.exceptions.ConnectionError as e:
             self.logger.error(f"Connection error for URL {url}: {e}")
-            self.is_connected = False  # Mark as disconnected
             return CommandResponse(False, f"Connection error: {e}")
         except Exception as e:
             self.logger.error(f"Unexpected error for URL {url}: {e}")
@@ -234,10 +388,95 @@ class ESP32Client:
         """
         return self._send_raw_command("STATUS_ALL")
     
+    def _send_raw_command(self, command: str) -> CommandResponse:
+        """
+        Answer a status command from the board's /status document.
+        
+        Supported commands:
+            PING          - board reachable and serving /status
+            STATUS_ALL    - full /status JSON
+            STATUS_<id>   - state of one relay channel as JSON
+        
+        :param command: Command name
+        :return: CommandResponse with the requested data
+        """
+        snapshot = self._get_status_snapshot()
+        if not snapshot.success:
+            return snapshot
+        
+        if command == "PING":
+            return CommandResponse(True, "Pong", status_code=snapshot.status_code)
+        if command == "STATUS_ALL":
+            return snapshot
+        if command.startswith("STATUS_"):
+            try:
+                device_id = int(command[len("STATUS_"):])
+                status = json.loads(snapshot.response_data)
+                states = status["relay_states"]
+                remaining = status.get("auto_off_remaining") or [None] * len(states)
+                if not 0 <= device_id < len(states):
+                    return CommandResponse(False, f"Unknown device: {device_id}", error_code=404)
+                device = {
+                    "device": device_id,
+                    "on": states[device_id],
+                    "auto_off_remaining": remaining[device_id],
+                }
+                return CommandResponse(True, "Device status retrieved", json.dumps(device),
+                                       status_code=snapshot.status_code)
+            except (ValueError, KeyError, TypeError, IndexError):
+                return CommandResponse(False, "Device state not reported by /status",
+                                       snapshot.response_data, status_code=snapshot.status_code)
+        return CommandResponse(False, f"Unknown command: {command}")
+    
+    def _get_status_snapshot(self) -> CommandResponse:
+        """
+        Get the board's /status, reusing a snapshot younger than status_ttl.
+        
+        Single-flight: while one caller fetches /status, concurrent callers
+        wait for and share its result instead of sending their own request.
+        
+        :return: CommandResponse whose response_data holds the /status JSON
+        """
+        with self._status_cond:
+            snapshot = self._status_snapshot
+            if snapshot is not None and time.monotonic() - self._status_time < self.status_ttl:
+                return snapshot
+            if self._status_inflight:
+                # Share the result of the request already on its way
+                generation = self._status_generation
+                while self._status_inflight and generation == self._status_generation:
+                    if not self._status_cond.wait(self.timeout):
+                        return CommandResponse(False, "Request timeout")
+                return self._status_result
+            self._status_inflight = True
+        
+        response = CommandResponse(False, "Status request failed")
+        try:
+            response = self._send_http_request(urljoin(self.base_url, "/status"))
+            return response
+        finally:
+            with self._status_cond:
+                self._status_inflight = False
+                self._status_result = response
+                self._status_generation += 1
+                if response.success:
+                    self._status_snapshot = response
+                    self._status_time = time.monotonic()
+                self._status_cond.notify_all()
+    
+    def _invalidate_status(self) -> None:
+        """Drop the cached /status snapshot after the board state changed."""
+        with self._status_cond:
+            self._status_snapshot = None
+    
     def test_connection(self) -> bool:
         """
         Test if connection is still alive.
         
+        Availability is tracked by the host's circuit breaker: while the
+        circuit is open this fails fast, and once it half-opens the PING
+        is sent as the probe that closes it again.
+        
         :return: True if connection is working
         """
         if not self.is_connected:
@@ -245,7 +484,252 @@ class ESP32Client:
         
         response = self._send_raw_command("PING")
         if not response.success:
-            self.logger.warning("Connection test failed, marking as disconnected")
-            self.is_connected = False
+            self.logger.warning(f"Connection test failed: {response.message}")
         
         return response.success
+
+
+# Connection pool bounds shared by every AsyncESP32Client on one session
+DEFAULT_POOL_LIMIT = 100        # Open connections across all boards
+DEFAULT_PER_HOST_LIMIT = 2      # Concurrent requests per board (ESP32 serves few sockets)
+
+
+def _require_aiohttp() -> None:
+    """Raise ImportError if the optional aiohttp dependency is missing."""
+    if aiohttp is None:
+        raise ImportError("AsyncESP32Client requires aiohttp (pip install aiohttp)")
+
+
+def create_async_session(timeout: float = 5, pool_limit: int = DEFAULT_POOL_LIMIT,
+                         per_host_limit: int = DEFAULT_PER_HOST_LIMIT):
+    """
+    Create an aiohttp session with a bounded, shared connection pool.
+    
+    :param timeout: Total timeout of one request in seconds
+    :param pool_limit: Maximum open connections across all hosts
+    :param per_host_limit: Maximum concurrent connections per host
+    :return: aiohttp.ClientSession
+    """
+    _require_aiohttp()
+    connector = aiohttp.TCPConnector(limit=pool_limit, limit_per_host=per_host_limit)
+    return aiohttp.ClientSession(connector=connector,
+                                 timeout=aiohttp.ClientTimeout(total=timeout))
+
+
+class AsyncESP32Client:
+    """
+    Asyncio ESP32 client for controlling many boards concurrently.
+    Mirrors ESP32Client on top of an aiohttp session, which may be shared
+    by many clients so they draw from one bounded connection pool.
+    """
+    
+    def __init__(self, host: str = "192.168.1.100", port: int = 80, timeout: float = 5,
+                 session=None):
+        """
+        Initialize async ESP32 client with connection parameters.
+        
+        :param host: ESP32 IP address
+        :param port: ESP32 web server port (usually 80)
+        :param timeout: HTTP request timeout in seconds
+        :param session: Shared aiohttp.ClientSession (optional, a private
+            one is created on first use and closed by close())
+        """
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.base_url = f"http://{host}" if port == 80 else f"http://{host}:{port}"
+        self.host_key = f"{host}:{port}"
+        self.is_connected = False
+        self.logger = logging.getLogger(__name__)
+        self._session = session
+        self._owns_session = session is None
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+    
+    def _get_session(self):
+        if self._session is None:
+            self._session = create_async_session(self.timeout)
+        return self._session
+    
+    async def close(self) -> None:
+        """Close the private session, if this client created one."""
+        self.is_connected = False
+        if self._owns_session and self._session is not None:
+            await self._session.close()
+            self._session = None
+    
+    async def _send_http_request(self, url: str, method: str = "GET",
+                                 data: Optional[Dict] = None) -> CommandResponse:
+        """
+        Send HTTP request to ESP32.
+        
+        :param url: Full URL to request
+        :param method: HTTP method (GET or POST)
+        :param data: POST data if applicable
+        :return: CommandResponse with result
+        :raises ImportError: If aiohttp is not installed
+        """
+        _require_aiohttp()  # A local problem, not the board's: keep it out of the breaker
+        breaker = breakers.get(self.host_key)
+        if not breaker.allow_request():
+            return CommandResponse(False, str(CircuitOpenError(self.host_key, breaker.retry_after())))
+        answered = False
+        host_failed = False
+        try:
+            session = self._get_session()
+            timeout = aiohttp.ClientTimeout(total=self.timeout)
+            async with session.request(method.upper(), url, data=data, timeout=timeout) as response:
+                answered = True
+                text = await response.text()
+            return interpret_response(url, response.status, text)
+        except asyncio.TimeoutError:
+            host_failed = True
+            self.logger.error(f"Request timeout for URL: {url}")
+            return CommandResponse(False, "Request timeout")
+        except aiohttp.ClientConnectionError as e:
+            host_failed = True
+            self.logger.error(f"Connection error for URL {url}: {e}")
+            return CommandResponse(False, f"Connection error: {e}")
+        except asyncio.CancelledError:
+            host_failed = True  # Deadline of gather_status expired
+            raise
+        except Exception as e:
+            self.logger.error(f"Unexpected error for URL {url}: {e}")
+            return CommandResponse(False, f"Unexpected error: {e}")
+        finally:
+            # Every path reports back, so a half-open probe never stays in
+            # flight; only transport failures count against the board
+            if answered:
+                breaker.record_success()
+            elif host_failed:
+                breaker.record_failure()
+            else:
+                breaker.release_probe()
+    
+    async def connect(self) -> bool:
+        """
+        Test connection to ESP32 web server and learn its command dialect.
+        
+        :return: True if connection successful, False otherwise
+        """
+        for endpoint in ["/status", "/"]:
+            response = await self._send_http_request(urljoin(self.base_url, endpoint))
+            if response.status_code is None:
+                return False
+            if response.status_code in (200, 404):
+                self.is_connected = True
+                await self._ensure_dialect()
+                return True
+        return False
+    
+    async def get_status(self) -> CommandResponse:
+        """
+        Fetch the board status document (GET /status).
+        
+        :return: CommandResponse whose response_data holds the JSON text
+        """
+        return await self._send_http_request(urljoin(self.base_url, "/status"))
+    
+    async def send_device_command(self, device_id: int, action: str, duration: int = 0) -> CommandResponse:
+        """
+        Send device control command to ESP32 via HTTP.
+        
+        Uses the same per-host dialect cache as ESP32Client.
+        
+        :param device_id: Device/relay ID (1-8 typically)
+        :param action: "ON" or "OFF"
+        :param duration: Duration in seconds for timed operations
+        :return: CommandResponse with operation result
+        """
+        action = action.lower()
+        dialect = dialect_cache.get(self.host_key)
+        if dialect is not None and (duration <= 0 or dialect.supports_duration):
+            response = await self._send_with_dialect(dialect, device_id, action, duration)
+            if response.success or response.status_code not in (None, 404):
+                return response
+            dialect_cache.invalidate(self.host_key)
+            if response.status_code is None:
+                return response  # Host unreachable
+        
+        for dialect in COMMAND_DIALECTS:
+            if duration > 0 and not dialect.supports_duration:
+                continue
+            response = await self._send_with_dialect(dialect, device_id, action, duration)
+            if response.success:
+                dialect_cache.remember(self.host_key, dialect)
+                return response
+            if response.status_code is None:
+                break  # Host unreachable or circuit open
+        
+        return CommandResponse(False, "All URL patterns failed")
+    
+    async def _send_with_dialect(self, dialect: CommandDialect, device_id: int, action: str,
+                                 duration: int = 0) -> CommandResponse:
+        path, data = dialect.build(device_id, action, duration)
+        return await self._send_http_request(urljoin(self.base_url, path), dialect.method, data=data)
+    
+    async def _ensure_dialect(self) -> Optional[CommandDialect]:
+        """
+        Discover the command dialect of the host once and cache it.
+        
+        :return: Cached or discovered dialect, None if none answered
+        """
+        dialect = dialect_cache.get(self.host_key)
+        if dialect is not None:
+            return dialect
+        for dialect in COMMAND_DIALECTS:
+            path, data = dialect.build(0, PROBE_ACTION)
+            response = await self._send_http_request(urljoin(self.base_url, path), dialect.method, data=data)
+            if response.status_code is None:
+                return None
+            if response.status_code != 404:
+                dialect_cache.remember(self.host_key, dialect)
+                return dialect
+        return None
+
+
+async def gather_status(hosts: List[str], timeout: float = 3, port: int = 80,
+                        session=None) -> Dict[str, CommandResponse]:
+    """
+    Poll /status on many boards concurrently.
+    
+    Every host gets its own deadline, so a dead or slow board only costs
+    its own timeout and never holds up the rest of the batch. At most as
+    many hosts as the session's pool holds are polled at once, and a
+    host's deadline only starts once it has a slot, so boards queued
+    behind dead ones are not timed out before their request is sent.
+    
+    :param hosts: Board IP addresses, optionally as "ip:port"
+    :param timeout: Per-host deadline in seconds
+    :param port: Web server port of the boards
+    :param session: Shared aiohttp.ClientSession (optional, a temporary
+        pooled session is created and closed otherwise)
+    :return: Host -> CommandResponse, in the order of ``hosts``
+    """
+    own_session = session is None
+    if own_session:
+        session = create_async_session(timeout)
+    slots = asyncio.Semaphore(session.connector.limit or max(1, len(hosts)))
+    
+    async def poll(host: str) -> CommandResponse:
+        name, _, host_port = host.partition(":")
+        client = AsyncESP32Client(name, int(host_port) if host_port else port, timeout,
+                                  session=session)
+        async with slots:
+            try:
+                return await asyncio.wait_for(client.get_status(), timeout)
+            except asyncio.TimeoutError:
+                return CommandResponse(False, "Request timeout")
+            except Exception as e:
+                return CommandResponse(False, f"Unexpected error: {e}")
+    
+    try:
+        results = await asyncio.gather(*(poll(host) for host in hosts))
+    finally:
+        if own_session:
+            await session.close()
+    return dict(zip(hosts, results))
@@ -13,12 +13,17 @@ Features:
 - Scheduled relay operations with time-based automation
 - Persian (Farsi) user interface
 - HTTP-based communication with error handling and retries
+- Keep-alive connections reused across pages, sessions and threads
+- Per-board circuit breaker shared by all sessions, so a rebooting board
+  fails fast instead of stalling every page
 
 Dependencies:
 - streamlit: Web application framework
 - requests: HTTP client library
 - threading: Background task execution
 - datetime: Time and scheduling operations
+- circuit_breaker: Retry backoff and per-host circuit breakers
+- http_sessions: Shared keep-alive sessions per board
 
 Author: Erfan Mohamadnia
 Protocol: HTTP
@@ -32,6 +37,15 @@ import threading
 from datetime import datetime, time as dt_time, timedelta
 import json
 
+from circuit_breaker import RetryPolicy, CircuitOpenError, call_with_retry
+from http_sessions import get_session, close_session
+
+# Failures that count against a board's circuit breaker
+CONNECTION_ERRORS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+
+# Seconds a scheduled OFF keeps retrying (through open circuits) before giving up
+SCHEDULED_OFF_DEADLINE = 300
+
 # --- Global Variables ---
 state = st.session_state
 
@@ -77,10 +91,46 @@ def load_css(file_path):
 load_css("assets/style.css")
 
 # --- HTTP Communication ---
+def esp_host_key():
+    """Return the circuit breaker key of the ESP32 (same key as ESP32Client)."""
+    return f"{state.esp_ip}:80"
+
+def esp_request(method, url, params=None, timeout=None, policy=None):
+    """
+    Sends one HTTP request to the ESP32 through its shared circuit breaker.
+    
+    The request uses the board's process-wide session, so keep-alive
+    connections are reused across clicks, pages and threads. Connection
+    errors and timeouts count against the board; once its circuit is
+    open, requests fail immediately with CircuitOpenError instead of
+    waiting for another timeout.
+    
+    Args:
+        method (str): "GET" or "POST".
+        url (str): Full request URL.
+        params (dict, optional): Query parameters.
+        timeout (float, optional): Request timeout, defaults to state.request_timeout.
+        policy (RetryPolicy, optional): Retry backoff, defaults to a single attempt.
+        
+    Returns:
+        requests.Response: The board's response.
+    """
+    timeout = timeout or state.request_timeout
+    session = get_session(state.esp_ip)
+    return call_with_retry(
+        esp_host_key(),
+        lambda: session.request(method, url, params=params, timeout=timeout),
+        policy or RetryPolicy(max_retries=1),
+        retry_on=CONNECTION_ERRORS
+    )
+
 def check_esp_availability():
     """
     Checks if the ESP32 HTTP server is available.
-    Manages retries and updates connection status in Streamlit's session state.
+    Sends a single request and updates connection status in Streamlit's
+    session state. Repeated failures open the board's circuit breaker;
+    while it is open the check returns immediately without touching the
+    network or sleeping, and once it half-opens this check is the probe.
     
     Returns:
         bool: True if ESP32 is responsive, False otherwise.
@@ -91,34 +141,36 @@ def check_esp_availability():
     
     base_url = f"http://{state.esp_ip}"
 
-    for attempt in range(state.max_retries):
-        try:
-            response = requests.get(f"{base_url}/status", timeout=state.request_timeout)
-            response.raise_for_status()
-            
-            state.connection_status = "Connected"
-            state.connection_status_color = "connected"
-            state.connection_message = f"متصل به {state.esp_ip} (HTTP)"
-            print("Successfully connected to ESP via HTTP.")
-            
-            if get_initial_status():
-                state.initial_status_fetched = True
-                print("Successfully fetched initial relay statuses via HTTP.")
-            else:
-                state.initial_status_fetched = False
-                st.warning("هشدار: دریافت وضعیت اولیه رله‌ها از طریق HTTP ناموفق بود.")
-            return True
-        except requests.exceptions.RequestException as e:
-            state.connection_status = f"Connection Failed: {e} (Attempt {attempt + 1})"
-            state.connection_status_color = "disconnected"
-            state.connection_message = f"خطا در ارتباط HTTP (تلاش {attempt + 1}): {e}"
-            print(state.connection_status)
-            if attempt < state.max_retries - 1:
-                time.sleep(state.retry_delay)
-            else:
-                st.error(f"ارتباط با ESP از طریق HTTP ناموفق بود پس از {state.max_retries} تلاش.")
-                return False
-    return False
+    try:
+        response = esp_request("GET", f"{base_url}/status")
+        response.raise_for_status()
+        
+        state.connection_status = "Connected"
+        state.connection_status_color = "connected"
+        state.connection_message = f"متصل به {state.esp_ip} (HTTP)"
+        print("Successfully connected to ESP via HTTP.")
+        
+        if get_initial_status():
+            state.initial_status_fetched = True
+            print("Successfully fetched initial relay statuses via HTTP.")
+        else:
+            state.initial_status_fetched = False
+            st.warning("هشدار: دریافت وضعیت اولیه رله‌ها از طریق HTTP ناموفق بود.")
+        return True
+    except CircuitOpenError as e:
+        state.connection_status = f"Connection Failed: {e}"
+        state.connection_status_color = "disconnected"
+        state.connection_message = f"ESP در دسترس نیست؛ تلاش بعدی تا {e.retry_after:.0f} ثانیه دیگر."
+        print(state.connection_status)
+        st.error(f"ESP پاسخ نمی‌دهد. بررسی مجدد پس از {e.retry_after:.0f} ثانیه امکان‌پذیر است.")
+        return False
+    except requests.exceptions.RequestException as e:
+        state.connection_status = f"Connection Failed: {e}"
+        state.connection_status_color = "disconnected"
+        state.connection_message = f"خطا در ارتباط HTTP: {e}"
+        print(state.connection_status)
+        st.error("ارتباط با ESP از طریق HTTP ناموفق بود.")
+        return False
 
 def send_http_request(endpoint, params=None, method="GET", expected_response_type="json"):
     """
@@ -145,10 +197,8 @@ def send_http_request(endpoint, params=None, method="GET", expected_response_typ
     
     try:
         print(f"Sending HTTP {method} request to {url} with params: {params}")
-        if method.upper() == "GET":
-            response = requests.get(url, params=params, timeout=state.request_timeout)
-        elif method.upper() == "POST":
-            response = requests.post(url, params=params, timeout=state.request_timeout)
+        if method.upper() in ("GET", "POST"):
+            response = esp_request(method.upper(), url, params=params)
         else:
             st.error(f"متد HTTP پشتیبانی نشده: {method}")
             return None
@@ -166,6 +216,9 @@ def send_http_request(endpoint, params=None, method="GET", expected_response_typ
         else:
             return response.text
             
+    except CircuitOpenError as e:
+        st.error(f"ESP پاسخ نمی‌دهد؛ درخواست به {endpoint} ارسال نشد (تلاش بعدی تا {e.retry_after:.0f} ثانیه دیگر).")
+        return None
     except requests.exceptions.Timeout:
         st.error(f"پاسخ از دستگاه برای درخواست به {endpoint} دریافت نشد (timeout).")
         return None
@@ -246,6 +299,50 @@ def toggle_relay(relay_num):
     else:
         st.error(f"خطا در تغییر وضعیت رله {relay_num} (HTTP). Response: {response}")
 
+def esp_request_until_done(url, deadline):
+    """
+    Sends a GET to the ESP32 and keeps retrying until it succeeds.
+    
+    Meant for safety-critical commands such as a scheduled OFF: an open
+    circuit is waited out (sleeping its retry_after) instead of failing
+    fast, and connection errors or 5xx answers are retried with backoff.
+    A 4xx answer is not retried, since repeating it cannot succeed.
+    
+    Args:
+        url (str): Full request URL.
+        deadline (float): Seconds after which the command is abandoned.
+        
+    Returns:
+        requests.Response: The board's successful response.
+        
+    Raises:
+        CircuitOpenError or requests.exceptions.RequestException: The last
+        failure, once the deadline has passed.
+    """
+    policy = RetryPolicy(max_retries=3)
+    give_up_at = time.monotonic() + deadline
+    attempt = 0
+    while True:
+        try:
+            response = esp_request("GET", url, policy=policy)
+            response.raise_for_status()
+            return response
+        except CircuitOpenError as e:
+            error, wait = e, max(e.retry_after, policy.base_delay)
+        except requests.exceptions.HTTPError as e:
+            if e.response is not None and e.response.status_code < 500:
+                raise
+            error, wait = e, policy.delay(attempt)
+        except requests.exceptions.RequestException as e:
+            error, wait = e, policy.delay(attempt)
+        
+        remaining = give_up_at - time.monotonic()
+        if remaining <= 0:
+            raise error
+        print(f"Retrying {url} in {min(wait, remaining):.1f}s: {error}")
+        time.sleep(min(wait, remaining))
+        attempt += 1
+
 def scheduled_task(relay_num, delay_seconds, duration_seconds):
     """
     Task executed in a separate thread to control a relay on a schedule via HTTP.
@@ -268,11 +365,11 @@ def scheduled_task(relay_num, delay_seconds, duration_seconds):
         on_endpoint = f"/relay/{esp_relay_index}/on"
         on_url = f"{base_url}{on_endpoint}"
         try:
-            on_response = requests.get(on_url, timeout=state.request_timeout)
+            on_response = esp_request("GET", on_url)
             on_response.raise_for_status()
             print(f"Relay {relay_num} ON command response (HTTP): {on_response.text}")
             print(f"Relay {relay_num} turned ON via schedule (HTTP).")
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, CircuitOpenError) as e:
             print(f"HTTP error in scheduled_task (ON) for relay {relay_num}: {e}")
             return
 
@@ -282,12 +379,13 @@ def scheduled_task(relay_num, delay_seconds, duration_seconds):
         off_endpoint = f"/relay/{esp_relay_index}/off"
         off_url = f"{base_url}{off_endpoint}"
         try:
-            off_response = requests.get(off_url, timeout=state.request_timeout)
-            off_response.raise_for_status()
+            # Never fail fast here: a relay left ON keeps a pump or motor running
+            off_response = esp_request_until_done(off_url, SCHEDULED_OFF_DEADLINE)
             print(f"Relay {relay_num} OFF command response (HTTP): {off_response.text}")
             print(f"Relay {relay_num} turned OFF via schedule (HTTP).")
-        except requests.exceptions.RequestException as e:
-            print(f"HTTP error in scheduled_task (OFF) for relay {relay_num}: {e}")
+        except (requests.exceptions.RequestException, CircuitOpenError) as e:
+            print(f"CRITICAL: relay {relay_num} could NOT be turned OFF after "
+                  f"{SCHEDULED_OFF_DEADLINE}s of retries and may still be ON: {e}")
 
     except Exception as e:
         print(f"Error in scheduled_task (HTTP) for relay {relay_num}: {e}")
@@ -450,6 +548,8 @@ with st.sidebar.expander("پیکربندی شبکه", expanded=False):
     if st.button("💾 ذخیره تنظیمات", key="save_settings", use_container_width=True):
         # Check if IP changed to reset connection
         ip_changed = new_esp_ip != state.esp_ip
+        if ip_changed:
+            close_session(state.esp_ip)  # Drop keep-alive connections to the old board
         
         # Update session state with new values
         state.esp_ip = new_esp_ip
@@ -0,0 +1,72 @@
+"""
+Shared pytest setup.
+
+Board modules (esp-board/) are written for MicroPython; the shims below
+map the MicroPython-only modules they import onto CPython equivalents so
+their pure logic can be exercised on the host. Host modules (repository
+root and pages/) are importable directly.
+"""
+
+import asyncio
+import gc
+import heapq
+import io
+import json
+import os
+import struct
+import sys
+import time
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (ROOT, os.path.join(ROOT, "pages"), os.path.join(ROOT, "esp-board")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+def _install_micropython_shims():
+    sys.modules.setdefault("uasyncio", asyncio)
+    sys.modules.setdefault("ujson", json)
+    sys.modules.setdefault("ustruct", struct)
+    sys.modules.setdefault("uio", io)
+    sys.modules.setdefault("uheapq", heapq)
+
+    if "machine" not in sys.modules:
+        machine = types.ModuleType("machine")
+
+        class Pin:
+            OUT = 1
+            IN = 0
+
+            def __init__(self, number, mode=None, *args):
+                self.number = number
+                self._value = None
+
+            def value(self, value=None):
+                if value is None:
+                    return self._value
+                self._value = value
+
+        class I2C:
+            def __init__(self, *args, **kwargs):
+                self.writes = []
+
+            def writeto_mem(self, address, register, data):
+                self.writes.append((address, register, bytes(data)))
+
+        machine.Pin = Pin
+        machine.I2C = I2C
+        sys.modules["machine"] = machine
+
+    if not hasattr(gc, "mem_alloc"):
+        gc.mem_alloc = lambda: 0
+        gc.mem_free = lambda: 100000
+
+    if not hasattr(time, "sleep_ms"):
+        time.sleep_ms = lambda ms: None
+        time.ticks_ms = lambda: int(time.monotonic() * 1000)
+        time.ticks_add = lambda ticks, delta: ticks + delta
+        time.ticks_diff = lambda new, old: new - old
+
+
+_install_micropython_shims()
@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+
+import esp8266_client
+from circuit_breaker import CLOSED, breakers
+from esp8266_client import AsyncESP32Client
+
+
+def test_missing_aiohttp_does_not_trip_the_breaker(monkeypatch):
+    monkeypatch.setattr(esp8266_client, "aiohttp", None)
+    client = AsyncESP32Client("10.20.0.1")
+    breaker = breakers.get(client.host_key)
+
+    for _ in range(breaker.failure_threshold + 1):
+        with pytest.raises(ImportError):
+            asyncio.run(client.get_status())
+
+    assert breaker.state == CLOSED
+
+
+def test_gather_status_deadline_starts_after_a_pool_slot():
+    async def scenario():
+        async def dead(reader, writer):
+            await asyncio.sleep(10)  # Accepts, never answers
+
+        async def healthy(reader, writer):
+            await reader.readuntil(b"\r\n\r\n")
+            body = b'{"relays": [0, 0, 0, 0]}'
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                         b"Content-Length: %d\r\nConnection: close\r\n\r\n%s" % (len(body), body))
+            await writer.drain()
+            writer.close()
+
+        servers = [await asyncio.start_server(dead, "127.0.0.1", 0) for _ in range(4)]
+        servers.append(await asyncio.start_server(healthy, "127.0.0.1", 0))
+        hosts = ["127.0.0.1:%d" % server.sockets[0].getsockname()[1] for server in servers]
+
+        session = esp8266_client.create_async_session(timeout=0.3, pool_limit=2)
+        try:
+            results = await esp8266_client.gather_status(hosts, timeout=0.3, session=session)
+        finally:
+            await session.close()
+            for server in servers:
+                server.close()
+
+        assert [results[host].success for host in hosts] == [False] * 4 + [True]
+
+    asyncio.run(scenario())
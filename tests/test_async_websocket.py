@@ -0,0 +1,46 @@
+import asyncio
+
+from lib.async_websocket import AsyncWebSocket
+
+
+class StalledWriter:
+    """Writer whose peer never reads: drain() never completes."""
+
+    def __init__(self):
+        self.data = bytearray()
+
+    def write(self, data):
+        self.data += data
+
+    async def drain(self):
+        await asyncio.Event().wait()
+
+
+class SilentReader:
+    """Reader of a half-open peer: nothing ever arrives."""
+
+    async def readexactly(self, n):
+        await asyncio.Event().wait()
+
+
+def test_stalled_client_is_dropped_after_write_timeout():
+    async def scenario():
+        ws = AsyncWebSocket(SilentReader(), StalledWriter(), write_timeout=0.05)
+        pending = [asyncio.create_task(ws.send_text(b"E relays {}")),
+                   asyncio.create_task(ws.ping())]
+        results = await asyncio.wait_for(asyncio.gather(*pending, return_exceptions=True), 1)
+        assert all(isinstance(result, OSError) for result in results)
+        assert ws.closed
+        await asyncio.wait_for(ws.close(), 1)  # Must not block on the dead socket
+
+    asyncio.run(scenario())
+
+
+def test_silent_client_times_out_in_recv():
+    async def scenario():
+        writer = StalledWriter()
+        ws = AsyncWebSocket(SilentReader(), writer, write_timeout=0.05, idle_timeout=0.05)
+        assert await asyncio.wait_for(ws.recv(), 1) is None
+        assert ws.closed
+
+    asyncio.run(scenario())
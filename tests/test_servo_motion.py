@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+
+from lib.servo_controler import ServoController
+
+
+async def _settle(servo, timeout=5.0):
+    async def wait():
+        while servo.is_moving():
+            await asyncio.sleep(0.001)
+    await asyncio.wait_for(wait(), timeout)
+
+
+@pytest.mark.parametrize("acceleration", [0, 200000])
+def test_every_retarget_ends_on_target(acceleration):
+    async def scenario():
+        servo = ServoController(max_speed=3000, acceleration=acceleration, step_ms=1)
+        servo.set_angle(90)
+
+        servo.move_to(180)
+        await asyncio.sleep(0.01)
+        servo.move_to(0)  # Reversal mid-flight
+        await _settle(servo)
+        assert servo.angle == 0
+
+        for target in (120, 30, 150, 150, 45):
+            servo.move_to(target)
+            await asyncio.sleep(0.005)
+        await _settle(servo)
+        assert servo.angle == servo.target == 45
+        assert servo._velocity == 0.0
+
+    asyncio.run(scenario())
+
+
+def test_release_forgets_duty():
+    servo = ServoController()
+    servo.set_angle(60)
+    writes = len(servo.i2c.writes)
+    servo.release()
+    servo.set_angle(60)
+    assert len(servo.i2c.writes) > writes + 1
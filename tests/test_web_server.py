@@ -0,0 +1,34 @@
+import asyncio
+
+import pytest
+
+from lib.relay_controller import RelayController
+from lib.web_server import WebServer
+
+
+async def _exchange(raw):
+    server = WebServer(RelayController([14, 25, 26, 27]), None, max_body=64)
+    listener = await asyncio.start_server(server.handle_request, "127.0.0.1", 0)
+    port = listener.sockets[0].getsockname()[1]
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        writer.write(raw)
+        await writer.drain()
+        return await asyncio.wait_for(reader.read(), 2), server
+    finally:
+        writer.close()
+        listener.close()
+
+
+@pytest.mark.parametrize("raw, status", [
+    (b"GARBAGE\r\n\r\nGET /status HTTP/1.1\r\n\r\n", b"400 Bad Request"),
+    (b"GET /\xff\xfe HTTP/1.1\r\n\r\n", b"400 Bad Request"),
+    (b"GET / FTP/1.0\r\n\r\n", b"400 Bad Request"),
+    (b"POST /relay/batch HTTP/1.1\r\nContent-Length: -1\r\n\r\n", b"400 Bad Request"),
+    (b"POST /relay/batch HTTP/1.1\r\nContent-Length: 5000\r\n\r\n", b"413 Payload Too Large"),
+])
+def test_bad_input_is_rejected_and_the_connection_closed(raw, status):
+    response, server = asyncio.run(_exchange(raw))
+    assert response.startswith(b"HTTP/1.1 " + status)
+    assert response.count(b"HTTP/1.1") == 1  # Nothing after it was served
+    assert server.active_connections == 0